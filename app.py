@@ -34,5 +34,9 @@ with app.app_context():
     app.register_blueprint(payment_bp, url_prefix="/payment")
     app.register_blueprint(sales_bp, url_prefix="/sales")
 
+    # Precarga del menú desde MENU_BLOB_PATH (si está configurado)
+    from handlers.menu_handler import warm_menu_cache
+    warm_menu_cache()
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,53 @@
+# benchmarks/bench_create_order.py
+"""
+Mide la latencia de create_order (p50/p99) para órdenes de 1, 10 y 50 líneas.
+Por defecto usa SQLite en memoria; con --database-uri se puede medir contra MySQL
+(en una base de datos de pruebas: el script crea platillos y órdenes).
+Uso: python benchmarks/bench_create_order.py [--rounds 300] [--database-uri URI]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--database-uri", default="sqlite://")
+    args = parser.parse_args()
+
+    import config
+    config.SQLALCHEMY_DATABASE_URI = args.database_uri
+
+    from app import app
+    from db_init import db
+    from handlers.order_handler import create_order
+    from models.menu_item_model import MenuItem
+
+    with app.app_context():
+        db.create_all()
+        menu = [MenuItem(name=f"Platillo {n}", description="benchmark", price=50 + n, available=True)
+                for n in range(50)]
+        db.session.add_all(menu)
+        db.session.commit()
+        menu_ids = [item.id for item in menu]
+
+        for lines in (1, 10, 50):
+            items = [{"menu_item_id": menu_ids[n % len(menu_ids)], "quantity": 1 + n % 3} for n in range(lines)]
+            samples = []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                create_order({"user_id": 1, "employee_id": 1, "items": items})
+                samples.append((time.perf_counter() - start) * 1000)
+            print(f"{lines:>3} líneas: p50={statistics.median(samples):.3f} ms "
+                  f"p99={percentile(samples, 99):.3f} ms ({args.rounds} órdenes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_menu_search.py
+"""
+Mide el índice de búsqueda difusa del menú sobre un catálogo sintético de 10k platillos.
+Uso: python benchmarks/bench_menu_search.py [--items 10000] [--rounds 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.menu_search import MenuSearchIndex
+
+DISHES = ["tacos", "quesadilla", "torta", "enchiladas", "pozole", "tamal", "sope", "gordita",
+          "burrito", "flauta", "tostada", "chilaquiles", "huarache", "molletes", "agua", "refresco",
+          "cerveza", "flan", "churros", "elote"]
+FILLINGS = ["al pastor", "de asada", "de suadero", "de carnitas", "de pollo", "de chorizo",
+            "de barbacoa", "de cochinita", "de nopal", "de queso", "de frijol", "de jamaica",
+            "de horchata", "de tamarindo", "de cajeta", "verde", "rojo", "de mole"]
+EXTRAS = ["", "", "con queso", "con piña", "con guacamole", "sin cebolla", "doble", "orden chica",
+          "orden grande", "especial de la casa"]
+QUERIES = ["2 tacos al pastr", "quesadiya de pollo", "enchilas verdes", "pozol rojo",
+           "agua de horchta", "chilakiles", "tortas de cochinta", "churos con cajeta"]
+
+def build_catalog(size, seed=7):
+    rng = random.Random(seed)
+    items = []
+    for item_id in range(1, size + 1):
+        name = " ".join(part for part in (rng.choice(DISHES), rng.choice(FILLINGS), rng.choice(EXTRAS)) if part)
+        items.append({
+            "id": item_id,
+            "name": f"{name} #{item_id}",
+            "description": f"{rng.choice(DISHES)} {rng.choice(FILLINGS)} preparado al momento",
+            "price": round(rng.uniform(15, 180), 2),
+            "available": rng.random() > 0.1
+        })
+    return items
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    items = build_catalog(args.items)
+    index = MenuSearchIndex()
+    start = time.perf_counter()
+    index.ensure(items)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"catálogo: {len(items)} platillos, construcción del índice: {build_ms:.1f} ms")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = index.search(query, limit=5)
+            samples.append((time.perf_counter() - start) * 1000)
+        top = results[0][1]["name"] if results else "-"
+        print(f"{query!r:28} p50={statistics.median(samples):.3f} ms "
+              f"p99={percentile(samples, 99):.3f} ms  top={top!r}")
+
+if __name__ == "__main__":
+    main()
@@ -7,3 +7,80 @@ DB_NAME = 'chatbot_db'
 
 SQLALCHEMY_DATABASE_URI = f'mysql+pymysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Segundos que un worker puede servir el menú desde su caché antes de recargarlo
+MENU_CACHE_TTL_SECONDS = 60
+# Secciones (categorías) del menú que cada worker guarda en caché; se descartan las menos usadas
+MENU_SECTION_CACHE_SIZE = 64
+
+# Paginación de GET /menu/ cuando se usan cursor, límite, filtros o proyección
+MENU_PAGE_SIZE = 100
+MENU_MAX_PAGE_SIZE = 500
+
+# Carga masiva de platillos (POST /menu/bulk)
+MENU_BULK_MAX_ROWS = 5000
+MENU_BULK_CHUNK_SIZE = 500
+
+# Server-Sent Events: eventos guardados para reconexión y segundos entre keepalives.
+# Los eventos son del proceso que los publica: /order/events y /menu/events se sirven con un solo worker
+SSE_HISTORY_SIZE = 1000
+SSE_KEEPALIVE_SECONDS = 15
+
+# Número de versiones del menú (snapshots inmutables) que cada proceso mantiene en memoria
+MENU_SNAPSHOT_CACHE_SIZE = 64
+
+# Archivo local con el menú ya serializado para que los workers arranquen con la caché caliente.
+# None desactiva la opción; por ejemplo: '/var/cache/chefbot/menu.bin'
+MENU_BLOB_PATH = None
+
+# Listado de órdenes (GET /order/): tamaño de página y filas leídas por lote del cursor del servidor
+ORDER_PAGE_SIZE = 100
+ORDER_MAX_PAGE_SIZE = 1000
+ORDER_STREAM_BATCH_SIZE = 500
+
+# Máximo de órdenes por petición en GET /order/batch
+ORDER_BATCH_MAX_IDS = 200
+
+# Idempotency-Key en POST /order/create y POST /payment/: respuestas guardadas en la tabla idempotency_keys,
+# cuánto tiempo se guardan, cuántos segundos espera una petición duplicada a la original
+# y cuántas claves vencidas se borran al guardar cada respuesta
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 30
+IDEMPOTENCY_PURGE_BATCH = 100
+
+# Cola de cocina: segundos de preparación por categoría del menú (las demás usan el valor por defecto),
+# segundos extra por cada unidad adicional, tiempo prometido para tener lista una orden
+# y cada cuántos segundos cada proceso vuelve a leer las órdenes activas de la base de datos
+KITCHEN_PREP_SECONDS_BY_CATEGORY = {}
+KITCHEN_DEFAULT_PREP_SECONDS = 600
+KITCHEN_EXTRA_UNIT_SECONDS = 60
+KITCHEN_TARGET_SECONDS = 20 * 60
+KITCHEN_QUEUE_RESYNC_SECONDS = 30
+KITCHEN_TOP_MAX_SIZE = 100
+
+# Máximo de órdenes por petición en POST /order/batch_create
+ORDER_BATCH_CREATE_MAX_ORDERS = 200
+
+# Archivado de órdenes: las completadas o canceladas con más de ORDER_ARCHIVE_AFTER_DAYS días
+# se mueven a orders_archive / order_items_archive en lotes de ORDER_ARCHIVE_CHUNK_SIZE.
+# Se ejecuta como un solo trabajo programado (flask db archive-orders desde cron, o con --every en un
+# solo proceso), no dentro de cada worker; también está POST /db/archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = 90
+ORDER_ARCHIVE_CHUNK_SIZE = 500
+
+# Órdenes revisadas por lote en POST /db/verify_order_totals
+ORDER_TOTALS_VERIFY_CHUNK_SIZE = 1000
+
+# Borrado masivo de órdenes (POST /order/batch_delete): órdenes por lote y máximo de IDs por petición
+ORDER_DELETE_CHUNK_SIZE = 500
+ORDER_BATCH_DELETE_MAX_IDS = 5000
+
+# Máximo de órdenes por petición en PATCH /order/status/bulk
+ORDER_STATUS_BULK_MAX_IDS = 1000
+
+# Carga masiva de ítems de órdenes (POST /order_item/bulk)
+ORDER_ITEM_BULK_MAX_ROWS = 1000
+ORDER_ITEM_BULK_CHUNK_SIZE = 500
+
+# Tablas pequeñas en las que la revisión de planes (flask db check-plans) acepta un recorrido completo
+QUERY_PLAN_FULL_SCAN_ALLOWED_TABLES = ()
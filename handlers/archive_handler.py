@@ -0,0 +1,85 @@
+# handlers/archive_handler.py
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, insert
+from config import ORDER_ARCHIVE_AFTER_DAYS, ORDER_ARCHIVE_CHUNK_SIZE
+from db_init import db
+from models.order_model import Order
+from models.order_item_model import OrderItem
+from models.payment_model import Payment
+from models.order_archive_model import OrderArchive, OrderItemArchive, PaymentArchive
+from models.order_status import CLOSED_STATUSES
+
+ORDER_COLUMNS = ("id", "user_id", "employee_id", "total", "status", "created_at", "menu_version")
+ORDER_ITEM_COLUMNS = ("id", "order_id", "menu_item_id", "quantity", "subtotal", "created_at")
+PAYMENT_COLUMNS = ("id", "order_id", "payment_method", "amount", "paid_at")
+
+def _copy_rows(source, target, columns, condition):
+    """
+    Copia a 'target' las filas de 'source' que cumplen 'condition' con un solo INSERT ... SELECT.
+    """
+    db.session.execute(
+        insert(target).from_select(
+            [target.c[name] for name in columns],
+            select(*[source.c[name] for name in columns]).where(condition)
+        )
+    )
+
+def archive_candidates_query(cutoff, chunk_size=ORDER_ARCHIVE_CHUNK_SIZE):
+    """
+    Construye la consulta de los IDs de órdenes cerradas creadas antes de 'cutoff'.
+    """
+    orders = Order.__table__
+    return (
+        select(orders.c.id)
+        .where(orders.c.status.in_(CLOSED_STATUSES), orders.c.created_at < cutoff)
+        .order_by(orders.c.id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    )
+
+def archive_orders_chunk(cutoff, chunk_size=ORDER_ARCHIVE_CHUNK_SIZE):
+    """
+    Mueve a las tablas de archivo hasta 'chunk_size' órdenes cerradas creadas antes de 'cutoff',
+    junto con sus ítems y pagos, en una transacción. Las órdenes se toman con FOR UPDATE SKIP LOCKED
+    para que dos workers archivando a la vez no tomen las mismas.
+    Retorna el número de órdenes archivadas.
+    """
+    orders = Order.__table__
+    items = OrderItem.__table__
+    payments = Payment.__table__
+    try:
+        order_ids = db.session.execute(archive_candidates_query(cutoff, chunk_size)).scalars().all()
+        if not order_ids:
+            db.session.rollback()
+            return 0
+        _copy_rows(orders, OrderArchive.__table__, ORDER_COLUMNS, orders.c.id.in_(order_ids))
+        _copy_rows(items, OrderItemArchive.__table__, ORDER_ITEM_COLUMNS, items.c.order_id.in_(order_ids))
+        _copy_rows(payments, PaymentArchive.__table__, PAYMENT_COLUMNS, payments.c.order_id.in_(order_ids))
+        db.session.execute(delete(payments).where(payments.c.order_id.in_(order_ids)))
+        db.session.execute(delete(items).where(items.c.order_id.in_(order_ids)))
+        db.session.execute(delete(orders).where(orders.c.id.in_(order_ids)))
+        db.session.commit()
+        return len(order_ids)
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error archivando órdenes: {str(e)}")
+
+def archive_closed_orders(older_than_days=ORDER_ARCHIVE_AFTER_DAYS, chunk_size=ORDER_ARCHIVE_CHUNK_SIZE, max_chunks=None):
+    """
+    Archiva las órdenes cerradas (completadas o canceladas) con más de 'older_than_days' días,
+    en lotes de 'chunk_size' órdenes, cada uno en su propia transacción corta para no bloquear
+    la tabla de órdenes. 'max_chunks' limita cuántos lotes se procesan en esta llamada.
+    Retorna un diccionario con las órdenes archivadas y los lotes procesados.
+    """
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    archived = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        count = archive_orders_chunk(cutoff, chunk_size)
+        if not count:
+            break
+        archived += count
+        chunks += 1
+        if count < chunk_size:
+            break
+    return {"archived": archived, "chunks": chunks, "cutoff": cutoff.isoformat()}
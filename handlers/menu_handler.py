@@ -1,50 +1,486 @@
 # handlers/menu_handler.py
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from flask import current_app
 from db_init import db
-from sqlalchemy import text
+from sqlalchemy import text, select, update
+from sqlalchemy.exc import IntegrityError
+from config import MENU_BULK_CHUNK_SIZE, MENU_BLOB_PATH
+from models.menu_item_model import MenuItem
+from models.menu_snapshot_model import MenuSnapshot
+from utils.event_stream import EventBroker
+from utils.helpers import parse_bool
+from utils.menu_cache import menu_cache, menu_snapshots, write_menu_blob, read_menu_blob, content_etag
+from utils.menu_search import menu_search_index
+
+# Cambios del menú para los clientes suscritos a GET /menu/events
+menu_events = EventBroker()
+
+# Versión vigente del menú en este proceso: tupla (etag, id de menu_snapshots)
+_current_snapshot = None
+
+def _menu_changed(event_type, data, snapshot):
+    """
+    Se llama después del commit de una escritura del menú con el resultado de _record_menu_snapshot
+    (guardado en la misma transacción): invalida la caché del menú, recuerda la versión y avisa
+    a los clientes suscritos.
+    La caché no se carga con el catálogo leído dentro de la transacción: ese catálogo puede no incluir
+    una escritura concurrente de otro worker, así que la siguiente lectura lo vuelve a cargar ya confirmado.
+    """
+    snapshot_id, _, body, etag = snapshot
+    menu_cache.invalidate()
+    _remember_snapshot(snapshot_id, body, etag)
+    menu_events.publish(event_type, dict(data, version=snapshot_id))
+
+def _load_all_menu_items():
+    """
+    Lee todos los platillos (con las columnas de MENU_FIELDS, incluida la categoría, en orden de ID)
+    y devuelve una lista de diccionarios. Es la misma forma que usan las secciones y las páginas del menú.
+    """
+    table = MenuItem.__table__
+    result = db.session.execute(select(*(table.c[name] for name in MENU_FIELDS)).order_by(table.c.id))
+    return [dict(row._mapping) for row in result]
 
 def get_all_menu_items():
     """
-    Ejecuta el procedimiento almacenado GetAllMenuItems y devuelve una lista de diccionarios con los platillos.
+    Devuelve una lista de diccionarios con los platillos.
+    Se sirve desde la caché en proceso; la base de datos solo se consulta cuando la caché está vacía o expiró.
     """
     try:
-        result = db.session.execute(text("CALL GetAllMenuItems()"))
-        items = [dict(row._mapping) for row in result]
-        return items
+        return menu_cache.get_all(_load_all_menu_items)
     except Exception as e:
         raise Exception(f"Error al obtener el menú: {str(e)}")
 
-def get_menu_item(item_id):
+def _serialize_menu(items):
+    return current_app.json.dumps(items).encode("utf-8")
+
+def get_all_menu_items_json():
     """
-    Ejecuta el procedimiento almacenado GetMenuItem para obtener los detalles de un platillo por su ID.
+    Devuelve una tupla (body, etag) con el menú completo ya serializado en JSON y su ETag.
+    Con la caché caliente no se consulta la base de datos ni se vuelve a serializar.
     """
     try:
-        result = db.session.execute(text("CALL GetMenuItem(:item_id)"), {"item_id": item_id})
-        row = result.fetchone()
-        if row:
-            return dict(row._mapping)
+        _, body, etag = menu_cache.get_catalog(_load_all_menu_items, _serialize_menu)
+        return body, etag
+    except Exception as e:
+        raise Exception(f"Error al obtener el menú: {str(e)}")
+
+def get_menu_etag():
+    """
+    Devuelve el ETag de la versión actual del menú.
+    Cambia con cada escritura del menú; sirve para responder If-None-Match sin consultar la base de datos.
+    """
+    try:
+        _, _, etag = menu_cache.get_catalog(_load_all_menu_items, _serialize_menu)
+        return etag
+    except Exception as e:
+        raise Exception(f"Error al obtener la versión del menú: {str(e)}")
+
+MENU_FIELDS = ("id", "name", "description", "price", "available", "category", "created_at")
+
+def normalize_category(value):
+    """
+    Normaliza el nombre de una categoría (sin espacios extremos y en minúsculas).
+    Retorna None si viene vacía; lanza ValueError si no es texto o es demasiado larga.
+    """
+    if value is None:
         return None
+    if not isinstance(value, str):
+        raise ValueError("'category' debe ser texto")
+    value = value.strip().lower()
+    if len(value) > 50:
+        raise ValueError("'category' no puede tener más de 50 caracteres")
+    return value or None
+
+def _load_menu_section(category):
+    table = MenuItem.__table__
+    result = db.session.execute(select(table).where(table.c.category == category).order_by(table.c.id))
+    return [dict(row._mapping) for row in result]
+
+def get_menu_section_json(category):
+    """
+    Devuelve una tupla (body, etag) con los platillos de una categoría ya serializados en JSON.
+    Cada categoría se guarda por separado en la caché del menú; la consulta usa el índice (category, available).
+    """
+    try:
+        _, body, etag = menu_cache.get_section(
+            ("category", category), lambda: _load_menu_section(category), _serialize_menu
+        )
+        return body, etag
+    except Exception as e:
+        raise Exception(f"Error al obtener la categoría del menú: {str(e)}")
+
+def list_menu_items(fields=None, cursor=None, limit=100, available=None, min_price=None, max_price=None,
+                    category=None):
+    """
+    Lista platillos paginando por ID (keyset): devuelve los platillos con id > cursor, en orden de ID.
+    Los filtros y la proyección de columnas se aplican en la consulta SQL.
+    Parámetros:
+      - fields: lista de columnas a devolver (el id siempre se incluye).
+      - cursor: último ID recibido en la página anterior.
+      - limit: número máximo de platillos.
+      - available: True/False para filtrar por disponibilidad.
+      - min_price / max_price: rango de precio (inclusive).
+      - category: categoría del platillo.
+    Retorna un diccionario con 'items' y 'next_cursor' (None si no hay más páginas).
+    """
+    table = MenuItem.__table__
+    columns = [table.c.id] + [table.c[name] for name in (fields or MENU_FIELDS) if name != "id"]
+    query = select(*columns)
+    if cursor is not None:
+        query = query.where(table.c.id > cursor)
+    if category is not None:
+        query = query.where(table.c.category == category)
+    if available is not None:
+        query = query.where(table.c.available == available)
+    if min_price is not None:
+        query = query.where(table.c.price >= min_price)
+    if max_price is not None:
+        query = query.where(table.c.price <= max_price)
+    # Se pide un registro extra para saber si existe una página siguiente
+    query = query.order_by(table.c.id).limit(limit + 1)
+    try:
+        rows = db.session.execute(query).fetchall()
+        items = [dict(row._mapping) for row in rows[:limit]]
+        next_cursor = items[-1]["id"] if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+    except Exception as e:
+        raise Exception(f"Error al listar el menú: {str(e)}")
+
+def get_menu_item(item_id):
+    """
+    Obtiene los detalles de un platillo por su ID desde el catálogo en caché.
+    Retorna None si el platillo no existe.
+    """
+    try:
+        return menu_cache.get_item(item_id, _load_all_menu_items)
     except Exception as e:
         raise Exception(f"Error al obtener el platillo: {str(e)}")
 
+def search_menu_items(query, limit=10, available_only=False):
+    """
+    Busca platillos por nombre y descripción tolerando errores de escritura.
+    El índice se construye sobre el catálogo en caché y se reconstruye cuando el catálogo cambia.
+    Retorna una lista de diccionarios con los datos del platillo y su 'score'.
+    """
+    try:
+        items = menu_cache.get_all(_load_all_menu_items)
+        menu_search_index.ensure(items)
+        results = menu_search_index.search(query, limit=limit, available_only=available_only)
+        return [dict(item, score=score) for score, item in results]
+    except Exception as e:
+        raise Exception(f"Error al buscar en el menú: {str(e)}")
+
+def get_menu_prices(item_ids):
+    """
+    Obtiene precio y disponibilidad de varios platillos con una sola consulta (WHERE id IN (...)).
+    Retorna un diccionario {id: {"price": Decimal, "available": bool}}; los IDs inexistentes no aparecen.
+    """
+    if not item_ids:
+        return {}
+    table = MenuItem.__table__
+    try:
+        rows = db.session.execute(
+            select(table.c.id, table.c.price, table.c.available).where(table.c.id.in_(set(item_ids)))
+        )
+        return {row.id: {"price": row.price, "available": bool(row.available)} for row in rows}
+    except Exception as e:
+        raise Exception(f"Error al obtener los precios del menú: {str(e)}")
+
+def _snapshot_entry(body):
+    items = json.loads(body)
+    return {"body": body, "items": {item["id"]: item for item in items}}
+
+def _record_menu_snapshot():
+    """
+    Guarda el menú actual como versión en la transacción actual, sin confirmar; quien llama hace
+    el commit junto con la escritura del menú, así si la versión no se puede guardar la escritura falla.
+    Si ya existe una versión con el mismo contenido se reutiliza (content_hash es único; si otro worker
+    la inserta al mismo tiempo se lee la suya) y se marca como vigente.
+    Cuesta O(tamaño del menú) por escritura: lee, serializa y calcula el hash del catálogo completo.
+    Si otra escritura concurrente no es visible en esta transacción la versión guardada no la incluye;
+    se corrige sola porque get_current_menu_version compara el ETag del catálogo ya confirmado con el
+    de la versión recordada y, si no coinciden, busca o crea la versión correcta.
+    Retorna una tupla (id, platillos, body, etag).
+    """
+    items = _load_all_menu_items()
+    body = _serialize_menu(items)
+    etag = content_etag(body)
+    table = MenuSnapshot.__table__
+    now = datetime.now()
+    snapshot_id = db.session.execute(select(table.c.id).where(table.c.content_hash == etag)).scalar()
+    if snapshot_id is None:
+        try:
+            with db.session.begin_nested():
+                snapshot_id = db.session.execute(
+                    table.insert().values(content_hash=etag, payload=body, activated_at=now)
+                ).inserted_primary_key[0]
+            return snapshot_id, items, body, etag
+        except IntegrityError:
+            snapshot_id = db.session.execute(
+                select(table.c.id).where(table.c.content_hash == etag).with_for_update()
+            ).scalar_one()
+    db.session.execute(update(table).where(table.c.id == snapshot_id).values(activated_at=now))
+    return snapshot_id, items, body, etag
+
+def _remember_snapshot(snapshot_id, body, etag):
+    global _current_snapshot
+    if menu_snapshots.get(snapshot_id) is None:
+        menu_snapshots.put(snapshot_id, _snapshot_entry(body))
+    _current_snapshot = (etag, snapshot_id)
+    _save_menu_blob(snapshot_id, etag, body)
+
+def record_menu_snapshot():
+    """
+    Guarda el menú actual como versión vigente (o reutiliza la que tenga el mismo contenido) y confirma.
+    Retorna el ID de la versión.
+    """
+    snapshot_id, items, body, etag = _record_menu_snapshot()
+    db.session.commit()
+    _remember_snapshot(snapshot_id, body, etag)
+    return snapshot_id
+
+def _latest_menu_snapshot():
+    table = MenuSnapshot.__table__
+    return db.session.execute(
+        select(table.c.id, table.c.content_hash)
+        .order_by(table.c.activated_at.desc(), table.c.id.desc())
+        .limit(1)
+    ).first()
+
+def _save_menu_blob(version, etag, body):
+    if not MENU_BLOB_PATH:
+        return
+    try:
+        write_menu_blob(MENU_BLOB_PATH, version, etag, body)
+    except OSError:
+        current_app.logger.exception("No se pudo escribir el archivo del menú")
+
+def warm_menu_cache():
+    """
+    Carga la caché del menú al arrancar el worker.
+    Si MENU_BLOB_PATH tiene un menú cuya versión coincide con la última de la base de datos
+    se usa ese archivo (una sola consulta a menu_snapshots, sin leer el menú ni serializar).
+    Si no coincide, el menú se carga de la base de datos y el archivo se reescribe para el siguiente arranque.
+    Retorna True si la caché quedó cargada desde el archivo.
+    """
+    global _current_snapshot
+    if not MENU_BLOB_PATH:
+        return False
+    try:
+        latest = _latest_menu_snapshot()
+        blob = read_menu_blob(MENU_BLOB_PATH)
+        if latest and blob and blob[0] == latest.id and blob[1] == latest.content_hash:
+            version, etag, body = blob
+            menu_cache.prime(json.loads(body), body, etag)
+            _current_snapshot = (etag, version)
+            return True
+        _, body, etag = menu_cache.get_catalog(_load_all_menu_items, _serialize_menu)
+        _save_menu_blob(get_current_menu_version(), etag, body)
+        return False
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("No se pudo precargar el menú")
+        return False
+    finally:
+        db.session.remove()
+
+def get_current_menu_version():
+    """
+    Retorna el ID de la versión del menú que corresponde al catálogo en caché; si todavía no existe la crea.
+    El ID se recuerda junto con el ETag del catálogo, así con la caché caliente no se consulta la base
+    de datos. Un cambio hecho en otro worker se ve al recargar la caché (MENU_CACHE_TTL_SECONDS).
+    """
+    global _current_snapshot
+    try:
+        _, body, etag = menu_cache.get_catalog(_load_all_menu_items, _serialize_menu)
+        current = _current_snapshot
+        if current is not None and current[0] == etag:
+            return current[1]
+        table = MenuSnapshot.__table__
+        version = db.session.execute(select(table.c.id).where(table.c.content_hash == etag)).scalar()
+        if version is None:
+            return record_menu_snapshot()
+        _current_snapshot = (etag, version)
+        return version
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error al obtener la versión del menú: {str(e)}")
+
+def get_menu_snapshot(version):
+    """
+    Retorna una versión del menú como diccionario con 'body' (JSON en bytes) e 'items' ({id: platillo}),
+    o None si no existe. Las versiones son inmutables, así que después de la primera lectura se sirven de la caché.
+    """
+    entry = menu_snapshots.get(version)
+    if entry is not None:
+        return entry
+    try:
+        payload = db.session.execute(
+            select(MenuSnapshot.payload).where(MenuSnapshot.id == version)
+        ).scalar()
+    except Exception as e:
+        raise Exception(f"Error al obtener la versión del menú: {str(e)}")
+    if payload is None:
+        return None
+    entry = _snapshot_entry(bytes(payload))
+    menu_snapshots.put(version, entry)
+    return entry
+
+def get_menu_snapshots(versions):
+    """
+    Retorna {versión: entrada} (como get_menu_snapshot) para varias versiones del menú.
+    Las que no están en la caché se leen con una sola consulta (WHERE id IN (...)); las que
+    no existen no aparecen en el resultado.
+    """
+    entries = {}
+    missing = []
+    for version in set(versions):
+        entry = menu_snapshots.get(version)
+        if entry is not None:
+            entries[version] = entry
+        else:
+            missing.append(version)
+    if not missing:
+        return entries
+    try:
+        rows = db.session.execute(
+            select(MenuSnapshot.id, MenuSnapshot.payload).where(MenuSnapshot.id.in_(missing))
+        ).all()
+    except Exception as e:
+        raise Exception(f"Error al obtener las versiones del menú: {str(e)}")
+    for row in rows:
+        entry = _snapshot_entry(bytes(row.payload))
+        menu_snapshots.put(row.id, entry)
+        entries[row.id] = entry
+    return entries
+
+def get_menu_cache_stats():
+    """
+    Retorna los contadores de aciertos, fallos e invalidaciones de la caché del menú.
+    """
+    return menu_cache.stats()
+
 def add_menu_item(data):
     """
-    Ejecuta el procedimiento almacenado AddMenuItem para agregar un nuevo platillo.
+    Agrega un nuevo platillo con un INSERT en la misma transacción que guarda la versión del menú.
     Se espera que 'data' sea un diccionario con las claves:
     - name
     - description
     - price
     - available
+    - category (opcional)
+    Retorna el ID del platillo creado. Lanza ValueError si los datos no son válidos.
     """
+    values, errors = validate_menu_row(data)
+    if errors:
+        raise ValueError("; ".join(errors))
     try:
-        db.session.execute(
-            text("CALL AddMenuItem(:name, :description, :price, :available)"),
-            data
-        )
+        item_id = db.session.execute(MenuItem.__table__.insert().values(**values)).inserted_primary_key[0]
+        snapshot = _record_menu_snapshot()
         db.session.commit()
+        _menu_changed("menu_changed", {"action": "add", "item_id": item_id}, snapshot)
+        return item_id
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error al agregar el platillo: {str(e)}")
 
+def validate_menu_row(row):
+    """
+    Valida y normaliza una fila de la carga masiva de platillos.
+    Retorna una tupla (valores, errores); 'valores' es None si la fila tiene errores.
+    """
+    if not isinstance(row, dict):
+        return None, ["La fila debe ser un objeto con name, description, price, available y category"]
+    errors = []
+    name = row.get("name")
+    if not isinstance(name, str) or not name.strip():
+        errors.append("'name' es obligatorio")
+    elif len(name.strip()) > 100:
+        errors.append("'name' no puede tener más de 100 caracteres")
+    description = row.get("description")
+    if description is not None and not isinstance(description, str):
+        errors.append("'description' debe ser texto")
+    price = row.get("price")
+    try:
+        price = Decimal(str(price)).quantize(Decimal("0.01"))
+        if not price.is_finite() or price < 0:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors.append("'price' debe ser un número mayor o igual a 0")
+    available = row.get("available", True)
+    try:
+        available = parse_bool(available) if available not in (None, "") else True
+    except ValueError:
+        errors.append("'available' debe ser verdadero o falso")
+    category = None
+    try:
+        category = normalize_category(row.get("category"))
+    except ValueError as e:
+        errors.append(str(e))
+    if errors:
+        return None, errors
+    return {
+        "name": name.strip(),
+        "description": description or None,
+        "price": price,
+        "available": available,
+        "category": category
+    }, []
+
+def bulk_add_menu_items(rows, chunk_size=MENU_BULK_CHUNK_SIZE):
+    """
+    Agrega muchos platillos en una sola transacción.
+    Primero valida todas las filas; si alguna tiene errores no se inserta ninguna.
+    Las filas válidas se insertan en lotes de 'chunk_size' con executemany y se confirma una sola vez.
+    Retorna una tupla (creados, resultados) donde 'resultados' tiene un diccionario por fila
+    con su número ('row', empezando en 1), su 'status' ('created', 'valid' o 'error') y sus 'errors'.
+    """
+    values = []
+    results = []
+    for number, row in enumerate(rows, start=1):
+        normalized, errors = validate_menu_row(row)
+        values.append(normalized)
+        results.append({"row": number, "status": "error", "errors": errors} if errors else {"row": number, "status": "valid"})
+    if not values or any(value is None for value in values):
+        return 0, results
+    try:
+        insert = MenuItem.__table__.insert()
+        for start in range(0, len(values), chunk_size):
+            db.session.execute(insert, values[start:start + chunk_size])
+        snapshot = _record_menu_snapshot()
+        db.session.commit()
+        _menu_changed("menu_changed", {"action": "bulk", "created": len(values)}, snapshot)
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error en la carga masiva de platillos: {str(e)}")
+    for result in results:
+        result["status"] = "created"
+    return len(values), results
+
+def set_menu_items_availability(item_ids, available):
+    """
+    Marca uno o varios platillos como disponibles o no disponibles ("86") con un solo UPDATE,
+    sin tocar nombre, descripción ni precio, y avisa el cambio a los clientes suscritos.
+    Retorna un diccionario con los IDs actualizados ('updated') y los que no existen ('not_found').
+    """
+    table = MenuItem.__table__
+    try:
+        found = set(db.session.execute(select(table.c.id).where(table.c.id.in_(item_ids))).scalars())
+        updated = [item_id for item_id in item_ids if item_id in found]
+        snapshot = None
+        if updated:
+            db.session.execute(update(table).where(table.c.id.in_(updated)).values(available=available))
+            snapshot = _record_menu_snapshot()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error al actualizar la disponibilidad: {str(e)}")
+    if snapshot:
+        _menu_changed("availability", {"ids": updated, "available": available}, snapshot)
+    return {"updated": updated, "not_found": [item_id for item_id in item_ids if item_id not in found]}
+
 def update_menu_item(item_id, data):
     """
     Ejecuta el procedimiento almacenado UpdateMenuItem para actualizar un platillo existente.
@@ -53,7 +489,9 @@ def update_menu_item(item_id, data):
     - description
     - price
     - available
+    - category (opcional; si se envía null se quita la categoría)
     """
+    category = normalize_category(data.get("category"))
     try:
         # Agregamos el item_id a los datos para pasarlo al SP
         data['item_id'] = item_id
@@ -61,7 +499,12 @@ def update_menu_item(item_id, data):
             text("CALL UpdateMenuItem(:item_id, :name, :description, :price, :available)"),
             data
         )
+        if "category" in data:
+            table = MenuItem.__table__
+            db.session.execute(update(table).where(table.c.id == item_id).values(category=category))
+        snapshot = _record_menu_snapshot()
         db.session.commit()
+        _menu_changed("menu_changed", {"action": "update", "item_id": item_id}, snapshot)
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error al actualizar el platillo: {str(e)}")
@@ -75,7 +518,9 @@ def delete_menu_item(item_id):
             text("CALL DeleteMenuItem(:item_id)"),
             {"item_id": item_id}
         )
+        snapshot = _record_menu_snapshot()
         db.session.commit()
+        _menu_changed("menu_changed", {"action": "delete", "item_id": item_id}, snapshot)
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error al eliminar el platillo: {str(e)}")
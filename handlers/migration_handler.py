@@ -0,0 +1,197 @@
+# handlers/migration_handler.py
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, select, func
+from sqlalchemy.schema import AddConstraint, CreateColumn
+from config import QUERY_PLAN_FULL_SCAN_ALLOWED_TABLES
+from db_init import db
+from handlers.order_handler import orders_query, orders_with_items_query, kitchen_tickets_query
+from handlers.archive_handler import archive_candidates_query
+# Se importan todos los modelos para que db.metadata tenga todas las tablas
+from models.employees_model import Employee
+from models.idempotency_key_model import IdempotencyKey
+from models.menu_item_model import MenuItem
+from models.menu_snapshot_model import MenuSnapshot
+from models.order_model import Order
+from models.order_item_model import OrderItem
+from models.order_archive_model import OrderArchive, OrderItemArchive, PaymentArchive
+from models.order_status import PENDING
+from models.payment_model import Payment
+from models.sales_model import Sale
+from models.user_model import User
+
+def _is_covered(index_columns, existing_indexes):
+    """
+    Indica si algún índice existente empieza con las mismas columnas que 'index_columns'.
+    """
+    size = len(index_columns)
+    return any(list(existing["column_names"][:size]) == index_columns for existing in existing_indexes)
+
+def _drop_foreign_key_sql(connection, table, name):
+    preparer = connection.dialect.identifier_preparer
+    keyword = "FOREIGN KEY" if connection.dialect.name == "mysql" else "CONSTRAINT"
+    return f"ALTER TABLE {preparer.format_table(table)} DROP {keyword} {preparer.quote(name or '')}"
+
+def _replace_foreign_key(connection, drop, constraint):
+    connection.exec_driver_sql(drop)
+    connection.execute(AddConstraint(constraint))
+
+def _pending_steps(connection):
+    """
+    Compara los modelos con la base de datos y retorna los pasos necesarios como tuplas
+    (accion, tabla, nombre, ejecutar, llave_foranea); 'ejecutar(connection)' aplica el paso
+    y es None si no se puede aplicar automáticamente.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    preparer = connection.dialect.identifier_preparer
+    steps = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            steps.append(("create_table", table.name, table.name, table.create, None))
+            continue
+
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                steps.append(("add_column", table.name, column.name, None, None))
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {CreateColumn(column).compile(dialect=connection.dialect)}"
+            steps.append(("add_column", table.name, column.name, lambda conn, ddl=ddl: conn.exec_driver_sql(ddl), None))
+
+        existing_indexes = inspector.get_indexes(table.name)
+        existing_names = {index["name"] for index in existing_indexes}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            index_columns = [column.name for column in index.columns]
+            if index.name in existing_names or _is_covered(index_columns, existing_indexes):
+                continue
+            steps.append(("create_index", table.name, index.name, index.create, None))
+
+        existing_fks = {
+            (tuple(fk["constrained_columns"]), fk["referred_table"]): fk
+            for fk in inspector.get_foreign_keys(table.name)
+        }
+        for constraint in table.foreign_key_constraints:
+            key = (tuple(constraint.column_keys), constraint.referred_table.name)
+            name = f"{'_'.join(constraint.column_keys)} -> {constraint.referred_table.name}"
+            existing = existing_fks.get(key)
+            if existing is None:
+                apply = lambda conn, constraint=constraint: conn.execute(AddConstraint(constraint))
+                steps.append(("add_foreign_key", table.name, name, apply, constraint))
+                continue
+            # La llave existe pero con otra regla ON DELETE (por ejemplo sin CASCADE): se reemplaza
+            ondelete = (existing.get("options") or {}).get("ondelete")
+            if (ondelete or "").upper() != (constraint.ondelete or "").upper():
+                drop = _drop_foreign_key_sql(connection, table, existing["name"])
+                apply = lambda conn, drop=drop, constraint=constraint: _replace_foreign_key(conn, drop, constraint)
+                steps.append(("replace_foreign_key", table.name, name, apply, constraint))
+    return steps
+
+def _count_orphans(connection, constraint):
+    """
+    Cuenta las filas cuya llave foránea apunta a una fila que no existe (impiden crear la restricción).
+    """
+    table = constraint.table
+    element = constraint.elements[0]
+    local, remote = element.parent, element.column
+    return connection.execute(
+        select(func.count()).select_from(table).where(
+            local.isnot(None),
+            ~select(remote).where(remote == local).exists()
+        )
+    ).scalar()
+
+def migrate_schema(dry_run=False):
+    """
+    Lleva una base de datos existente al esquema de los modelos, sin borrar nada:
+    crea las tablas que faltan, agrega columnas nuevas (que acepten NULL o tengan valor por defecto),
+    crea los índices declarados que no existan (o que no estén cubiertos por otro índice con las
+    mismas primeras columnas) y agrega las llaves foráneas que falten si no hay filas huérfanas
+    (o las reemplaza si existen con otra regla ON DELETE).
+    Cada paso se aplica por separado; un paso con error no detiene los demás.
+    Con dry_run=True solo reporta los pasos pendientes.
+    Retorna un diccionario con 'ok' y la lista de 'steps' (action, table, name, status y error).
+    """
+    results = []
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for action, table, name, apply, constraint in _pending_steps(connection):
+            result = {"action": action, "table": table, "name": name, "status": "pending"}
+            results.append(result)
+            if apply is None:
+                result.update(status="error", error="La columna es NOT NULL sin valor por defecto; se debe agregar a mano")
+                continue
+            if constraint is not None:
+                if connection.dialect.name == "sqlite":
+                    result.update(status="skipped", error="SQLite no permite agregar llaves foráneas con ALTER TABLE")
+                    continue
+                orphans = _count_orphans(connection, constraint)
+                if orphans:
+                    result.update(status="error", error=f"{orphans} filas apuntan a registros que no existen")
+                    continue
+            if dry_run:
+                continue
+            try:
+                apply(connection)
+                result["status"] = "applied"
+            except Exception as e:
+                result.update(status="error", error=str(e))
+    return {
+        "ok": all(result["status"] != "error" for result in results),
+        "dry_run": dry_run,
+        "steps": results
+    }
+
+def _plan_queries():
+    """
+    Consultas de los handlers que deben resolverse con índices, con valores de ejemplo.
+    """
+    now = datetime.now()
+    return [
+        ("orders_by_status", orders_query({"status": PENDING}, limit=100)),
+        ("orders_by_user", orders_query({"user_id": 1}, limit=100)),
+        ("orders_by_date", orders_query({"date_from": now - timedelta(days=1), "date_to": now}, limit=100)),
+        ("orders_next_page", orders_query(after=(now, 1), limit=100)),
+        ("orders_export_by_date", orders_with_items_query({"date_from": now - timedelta(days=30), "date_to": now})),
+        ("kitchen_active_orders", kitchen_tickets_query()),
+        ("archive_candidates", archive_candidates_query(now - timedelta(days=90))),
+        ("order_items_by_order", select(OrderItem.__table__).where(OrderItem.__table__.c.order_id == 1)),
+        ("payments_by_order", select(Payment.__table__).where(Payment.__table__.c.order_id == 1)),
+        ("menu_by_category", select(MenuItem.__table__).where(MenuItem.__table__.c.category == "bebidas"))
+    ]
+
+def _explain(connection, query, allowed_tables=QUERY_PLAN_FULL_SCAN_ALLOWED_TABLES):
+    """
+    Ejecuta EXPLAIN (MySQL) o EXPLAIN QUERY PLAN (SQLite) y retorna una tupla (plan, tablas_recorridas_completas).
+    Cuenta como recorrido completo todo acceso 'ALL' (MySQL) o 'SCAN' sin índice (SQLite), aunque existan
+    índices posibles, salvo en las tablas de 'allowed_tables'. En MySQL conviene correr la revisión con datos
+    de tamaño real: con tablas casi vacías el optimizador puede preferir leer toda la tabla.
+    """
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, params).all()
+        plan = [row[-1] for row in rows]
+        full_scans = [
+            detail for detail in plan
+            if detail.startswith("SCAN ") and "INDEX" not in detail and detail.split()[1] not in allowed_tables
+        ]
+        return plan, full_scans
+    rows = connection.exec_driver_sql("EXPLAIN " + compiled.string, params).mappings().all()
+    plan = [{key: row[key] for key in ("table", "type", "possible_keys", "key", "rows")} for row in rows]
+    full_scans = [row["table"] for row in plan if row["type"] == "ALL" and row["table"] not in allowed_tables]
+    return plan, full_scans
+
+def check_query_plans():
+    """
+    Revisa el plan de las consultas principales de los handlers y marca las que recorren
+    una tabla completa. Retorna un diccionario con 'ok' y el resultado de cada consulta.
+    """
+    checks = []
+    with db.engine.connect() as connection:
+        for name, query in _plan_queries():
+            plan, full_scans = _explain(connection, query)
+            checks.append({"name": name, "ok": not full_scans, "full_scans": full_scans, "plan": plan})
+    return {"ok": all(check["ok"] for check in checks), "checks": checks}
@@ -1,7 +1,240 @@
 # handlers/order_handler.py
+import base64
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update, delete, and_, or_
+from sqlalchemy.orm import joinedload, selectinload
+from config import (
+    ORDER_STREAM_BATCH_SIZE,
+    ORDER_DELETE_CHUNK_SIZE,
+    KITCHEN_PREP_SECONDS_BY_CATEGORY,
+    KITCHEN_DEFAULT_PREP_SECONDS,
+    KITCHEN_EXTRA_UNIT_SECONDS,
+    KITCHEN_TARGET_SECONDS,
+    KITCHEN_QUEUE_RESYNC_SECONDS
+)
 from db_init import db
+from handlers.menu_handler import get_menu_prices, get_current_menu_version, get_menu_snapshot, get_menu_snapshots
 from models.order_model import Order
 from models.order_item_model import OrderItem
+from models.menu_item_model import MenuItem
+from models.order_archive_model import OrderArchive
+from models.payment_model import Payment
+from models.order_status import (
+    ACTIVE_STATUSES,
+    CLOSED_STATUSES,
+    PENDING,
+    InvalidStatusTransition,
+    can_transition,
+    source_statuses,
+    validate_status
+)
+from utils.event_stream import EventBroker
+from utils.kitchen_queue import KitchenQueue
+
+# Cambios de estado de las órdenes para los clientes suscritos a /order/events
+order_events = EventBroker()
+
+def _publish_status_change(order_id, previous_status, status, user_id, employee_id, version=0):
+    """
+    Publica un evento 'status_changed'. Se llama después del commit.
+    Al crear una orden previous_status es None; también puede serlo si el estado anterior no se conoce.
+    """
+    order_events.publish("status_changed", {
+        "order_id": order_id,
+        "previous_status": previous_status,
+        "status": status,
+        "user_id": user_id,
+        "employee_id": employee_id,
+        "version": version
+    })
+
+# Tickets de cocina de las órdenes activas, ordenados por la hora en que conviene empezar a prepararlas
+kitchen_queue = KitchenQueue()
+
+def estimate_prep_seconds(lines):
+    """
+    Estima los segundos de preparación de una orden a partir de sus líneas (categoria, cantidad).
+    Los platillos se preparan en paralelo: se toma el de mayor tiempo según su categoría
+    y se suman KITCHEN_EXTRA_UNIT_SECONDS por cada unidad adicional.
+    """
+    if not lines:
+        return 0
+    slowest = max(KITCHEN_PREP_SECONDS_BY_CATEGORY.get(category, KITCHEN_DEFAULT_PREP_SECONDS) for category, _ in lines)
+    units = sum(quantity for _, quantity in lines)
+    return slowest + KITCHEN_EXTRA_UNIT_SECONDS * max(units - len(lines), 0)
+
+def kitchen_tickets_query(order_ids=None):
+    """
+    Construye la consulta de las órdenes activas con la categoría y cantidad de sus ítems.
+    """
+    orders = Order.__table__
+    items = OrderItem.__table__
+    menu = MenuItem.__table__
+    query = select(
+        orders.c.id, orders.c.user_id, orders.c.employee_id, orders.c.status, orders.c.version,
+        orders.c.created_at, items.c.quantity, menu.c.category
+    ).select_from(
+        orders.outerjoin(items, items.c.order_id == orders.c.id).outerjoin(menu, menu.c.id == items.c.menu_item_id)
+    ).where(orders.c.status.in_(ACTIVE_STATUSES)).order_by(orders.c.id)
+    if order_ids is not None:
+        query = query.where(orders.c.id.in_(order_ids))
+    return query
+
+def _load_kitchen_tickets(order_ids=None):
+    """
+    Lee las órdenes activas (todas o solo las de 'order_ids') con la categoría y cantidad de sus ítems
+    en una sola consulta, y retorna una lista de tuplas (order_id, prioridad, ticket) para KitchenQueue.
+    La prioridad es start_by: la hora a la que hay que empezar la orden para tenerla lista
+    KITCHEN_TARGET_SECONDS después de creada; las órdenes más antiguas o más lentas salen primero.
+    """
+    grouped = {}
+    for row in db.session.execute(kitchen_tickets_query(order_ids)):
+        order = grouped.setdefault(row.id, {"row": row, "lines": []})
+        if row.quantity is not None:
+            order["lines"].append((row.category, row.quantity))
+    tickets = []
+    for order_id, order in grouped.items():
+        row = order["row"]
+        created_at = row.created_at or datetime.now()
+        prep_seconds = estimate_prep_seconds(order["lines"])
+        ready_by = created_at + timedelta(seconds=KITCHEN_TARGET_SECONDS)
+        start_by = ready_by - timedelta(seconds=prep_seconds)
+        tickets.append((order_id, (start_by, created_at), {
+            "order_id": order_id,
+            "status": row.status,
+            "version": row.version,
+            "user_id": row.user_id,
+            "employee_id": row.employee_id,
+            "units": sum(quantity for _, quantity in order["lines"]),
+            "prep_seconds": prep_seconds,
+            "created_at": created_at.isoformat(),
+            "start_by": start_by.isoformat(),
+            "ready_by": ready_by.isoformat()
+        }))
+    return tickets
+
+def load_kitchen_queue():
+    """
+    Reconstruye la cola de cocina con las órdenes activas de la base de datos.
+    """
+    try:
+        kitchen_queue.replace_all(_load_kitchen_tickets())
+    except Exception as e:
+        raise Exception(f"Error cargando la cola de cocina: {str(e)}")
+
+def _sync_kitchen_tickets(order_ids, status, versions=None):
+    """
+    Actualiza la cola de cocina después de crear órdenes o cambiar su estado a 'status'
+    ('versions' es un diccionario opcional {order_id: nueva versión}).
+    Las órdenes que no estaban en la cola se leen con una sola consulta.
+    Se llama después del commit; si falla, las órdenes ya quedaron guardadas y la cola
+    se corrige en la siguiente recarga. Si la cola todavía no se cargó no hace nada.
+    """
+    if kitchen_queue.loaded_at is None:
+        return
+    try:
+        if status not in ACTIVE_STATUSES:
+            for order_id in order_ids:
+                kitchen_queue.remove(order_id)
+            return
+        missing = []
+        for order_id in order_ids:
+            changes = {"version": versions[order_id]} if versions else {}
+            if not kitchen_queue.update(order_id, status=status, **changes):
+                missing.append(order_id)
+        if missing:
+            for ticket in _load_kitchen_tickets(missing):
+                kitchen_queue.push(*ticket)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("No se pudo actualizar la cola de cocina")
+
+def refresh_kitchen_tickets(order_ids):
+    """
+    Vuelve a leer los tickets de cocina de 'order_ids' después de cambiar sus ítems
+    (cambian las unidades, el tiempo de preparación y la prioridad).
+    Si la cola todavía no se cargó no hace nada: la primera lectura la carga completa.
+    Se llama después del commit; si falla, la cola se corrige en la siguiente recarga.
+    """
+    if kitchen_queue.loaded_at is None or not order_ids:
+        return
+    try:
+        tickets = _load_kitchen_tickets(order_ids)
+        for ticket in tickets:
+            kitchen_queue.push(*ticket)
+        active = {ticket[0] for ticket in tickets}
+        for order_id in order_ids:
+            if order_id not in active:
+                kitchen_queue.remove(order_id)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("No se pudo actualizar la cola de cocina")
+
+def get_kitchen_tickets(limit, status=None):
+    """
+    Retorna los 'limit' tickets de cocina más urgentes, opcionalmente solo los de un estado.
+    Cada proceso tiene su propia cola; se vuelve a leer de la base de datos si pasaron más de
+    KITCHEN_QUEUE_RESYNC_SECONDS, para incluir los cambios hechos en otros workers.
+    """
+    loaded_at = kitchen_queue.loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > KITCHEN_QUEUE_RESYNC_SECONDS:
+        load_kitchen_queue()
+    predicate = (lambda ticket: ticket["status"] == status) if status else None
+    return kitchen_queue.top(limit, predicate)
+
+def _is_positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def _validate_order_items(items):
+    """
+    Valida la forma de los ítems de una orden sin consultar el menú. Retorna la lista de errores.
+    """
+    if not isinstance(items, list) or not items:
+        return ["La orden debe tener al menos un ítem."]
+    errors = []
+    for number, item in enumerate(items, start=1):
+        if not isinstance(item, dict) or not _is_positive_int(item.get('menu_item_id')):
+            errors.append(f"Ítem {number}: 'menu_item_id' no es válido")
+        elif not _is_positive_int(item.get('quantity', 1)):
+            errors.append(f"Ítem {number}: 'quantity' debe ser un entero mayor a 0")
+    return errors
+
+def price_order_items(items, prices=None):
+    """
+    Valida los ítems de una orden y calcula su subtotal con el precio del menú.
+    Los precios se obtienen con una sola consulta para toda la lista; el precio enviado
+    por el cliente se ignora. Cada ítem debe tener:
+      - menu_item_id: ID del platillo
+      - quantity: cantidad (opcional, por defecto 1)
+    'prices' permite pasar precios ya consultados con get_menu_prices (por ejemplo para varias órdenes).
+    Retorna una tupla (lineas, total) donde cada línea tiene menu_item_id, quantity y subtotal.
+    Lanza ValueError si algún ítem no es válido, no existe o no está disponible.
+    """
+    errors = _validate_order_items(items)
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    if prices is None:
+        prices = get_menu_prices([item['menu_item_id'] for item in items])
+    lines = []
+    total = 0
+    for number, item in enumerate(items, start=1):
+        menu_item = prices.get(item['menu_item_id'])
+        if menu_item is None:
+            errors.append(f"Ítem {number}: el platillo {item['menu_item_id']} no existe")
+            continue
+        if not menu_item["available"]:
+            errors.append(f"Ítem {number}: el platillo {item['menu_item_id']} no está disponible")
+            continue
+        quantity = item.get('quantity', 1)
+        subtotal = menu_item["price"] * quantity
+        total += subtotal
+        lines.append({"menu_item_id": item['menu_item_id'], "quantity": quantity, "subtotal": float(subtotal)})
+    if errors:
+        raise ValueError("; ".join(errors))
+    return lines, float(total)
 
 def create_order(data):
     """
@@ -12,118 +245,561 @@ def create_order(data):
       - items: lista de ítems, cada uno con:
           - menu_item_id: ID del ítem del menú
           - quantity: cantidad (opcional, por defecto 1)
-          - price: precio unitario (para calcular el subtotal)
+    El precio de cada ítem se toma del menú, no del cliente, y la orden guarda la versión
+    del menú vigente (menu_version). La orden y sus ítems se guardan en una sola transacción.
+    Lanza ValueError si los datos no son válidos.
     """
     user_id = data.get('user_id')
     employee_id = data.get('employee_id')
     items = data.get('items')  # lista de ítems
 
     if not user_id or not items:
-        raise Exception("Datos insuficientes para crear la orden.")
+        raise ValueError("Datos insuficientes para crear la orden.")
+
+    lines, total = price_order_items(items)
+    menu_version = get_current_menu_version()
 
     try:
-        # Calcular total de la orden
-        total = sum(item.get('price', 0) * item.get('quantity', 1) for item in items)
-        new_order = Order(user_id=user_id, employee_id=employee_id, total=total, status='pendiente')
+        new_order = Order(
+            user_id=user_id,
+            employee_id=employee_id,
+            total=total,
+            status=PENDING,
+            menu_version=menu_version
+        )
         db.session.add(new_order)
-        db.session.commit()  # Para obtener new_order.id
-
-        # Crear los ítems de la orden
-        for item in items:
-            quantity = item.get('quantity', 1)
-            price = item.get('price', 0)
-            subtotal = price * quantity
-            order_item = OrderItem(
-                order_id=new_order.id,
-                menu_item_id=item.get('menu_item_id'),
-                quantity=quantity,
-                subtotal=subtotal
-            )
-            db.session.add(order_item)
+        db.session.flush()  # Para obtener new_order.id sin confirmar todavía
+        order_id = new_order.id
+
+        # Todos los ítems en un solo INSERT (executemany) dentro de la misma transacción
+        db.session.execute(
+            OrderItem.__table__.insert(),
+            [dict(line, order_id=order_id) for line in lines]
+        )
         db.session.commit()
+        _publish_status_change(order_id, None, PENDING, user_id, employee_id)
+        _sync_kitchen_tickets([order_id], PENDING)
 
-        return new_order.id
+        return order_id
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error creando la orden: {str(e)}")
 
-def get_orders():
+def create_orders(orders_data):
+    """
+    Crea varias órdenes (por ejemplo de un evento o una mesa grande) en una sola transacción.
+    Cada orden tiene la misma forma que en create_order. Primero se validan todas y se calculan
+    sus precios con una sola consulta al menú; si alguna tiene errores no se crea ninguna.
+    Las órdenes se insertan juntas en un solo flush y todos sus ítems en un solo INSERT (executemany).
+    Retorna una tupla (creadas, resultados) donde 'resultados' tiene un diccionario por orden
+    con su número ('row', empezando en 1), su 'status' ('created', 'valid' o 'error'),
+    su 'order_id' cuando se creó y sus 'errors'.
+    """
+    results = []
+    valid = []
+    for number, data in enumerate(orders_data, start=1):
+        if not isinstance(data, dict):
+            errors = ["La orden debe ser un objeto con user_id e items"]
+        else:
+            errors = [] if data.get('user_id') else ["'user_id' es obligatorio"]
+            errors.extend(_validate_order_items(data.get('items')))
+        results.append({"row": number, "status": "error", "errors": errors} if errors else {"row": number, "status": "valid"})
+        valid.append(None if errors else data)
+
+    prices = get_menu_prices([
+        item['menu_item_id'] for data in valid if data is not None for item in data['items']
+    ])
+    priced = []
+    for data, result in zip(valid, results):
+        if data is None:
+            continue
+        try:
+            priced.append((data, result) + price_order_items(data['items'], prices))
+        except ValueError as e:
+            result.update(status="error", errors=str(e).split("; "))
+    if not priced or len(priced) < len(results):
+        return 0, results
+
+    menu_version = get_current_menu_version()
+    try:
+        new_orders = [
+            Order(
+                user_id=data.get('user_id'),
+                employee_id=data.get('employee_id'),
+                total=total,
+                status=PENDING,
+                menu_version=menu_version
+            )
+            for data, _, _, total in priced
+        ]
+        db.session.add_all(new_orders)
+        db.session.flush()
+        order_ids = [order.id for order in new_orders]
+        db.session.execute(
+            OrderItem.__table__.insert(),
+            [
+                dict(line, order_id=order_id)
+                for order_id, (_, _, lines, _) in zip(order_ids, priced)
+                for line in lines
+            ]
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error creando las órdenes: {str(e)}")
+
+    for order_id, (data, result, _, _) in zip(order_ids, priced):
+        result.update(status="created", order_id=order_id)
+        _publish_status_change(order_id, None, PENDING, data.get('user_id'), data.get('employee_id'))
+    _sync_kitchen_tickets(order_ids, PENDING)
+    return len(order_ids), results
+
+ORDER_FILTERS = ("status", "user_id", "employee_id", "date_from", "date_to")
+
+def encode_order_cursor(created_at, order_id):
+    """
+    Codifica la posición (created_at, id) de la última orden de una página como cursor opaco.
+    Retorna None si la orden no tiene created_at (esas órdenes no entran en las páginas).
+    """
+    if created_at is None:
+        return None
+    raw = f"{created_at.isoformat()}|{order_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_order_cursor(cursor):
+    """
+    Decodifica un cursor de encode_order_cursor. Lanza ValueError si no es válido.
+    """
+    try:
+        created_at, order_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("El parámetro 'cursor' no es válido")
+
+def _order_conditions(filters):
+    """
+    Traduce los filtros de órdenes a condiciones SQL.
+    'date_from' es inclusivo y 'date_to' exclusivo (datetime).
+    """
+    table = Order.__table__
+    conditions = []
+    if filters.get("status") is not None:
+        conditions.append(table.c.status == filters["status"])
+    if filters.get("user_id") is not None:
+        conditions.append(table.c.user_id == filters["user_id"])
+    if filters.get("employee_id") is not None:
+        conditions.append(table.c.employee_id == filters["employee_id"])
+    if filters.get("date_from") is not None:
+        conditions.append(table.c.created_at >= filters["date_from"])
+    if filters.get("date_to") is not None:
+        conditions.append(table.c.created_at < filters["date_to"])
+    return conditions
+
+def _order_row_to_dict(row):
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "employee_id": row.employee_id,
+        "total": row.total,
+        "status": row.status,
+        "version": row.version,
+        "menu_version": row.menu_version,
+        "created_at": row.created_at.isoformat() if row.created_at else None
+    }
+
+def orders_query(filters=None, after=None, limit=None):
+    """
+    Construye la consulta de iter_orders (también la usa la revisión de planes de consulta).
+    Al paginar ('after' o 'limit') se excluyen las órdenes sin created_at, que no tienen cursor.
+    """
+    table = Order.__table__
+    conditions = _order_conditions(filters or {})
+    if after is not None or limit is not None:
+        conditions.append(table.c.created_at.isnot(None))
+    if after is not None:
+        created_at, order_id = after
+        # created_at >= ? es redundante, pero permite recorrer ix_orders_created_at_id por rango (el OR solo no)
+        conditions.append(table.c.created_at >= created_at)
+        conditions.append(or_(
+            table.c.created_at > created_at,
+            and_(table.c.created_at == created_at, table.c.id > order_id)
+        ))
+    query = select(
+        table.c.id, table.c.user_id, table.c.employee_id, table.c.total,
+        table.c.status, table.c.version, table.c.menu_version, table.c.created_at
+    ).where(*conditions).order_by(table.c.created_at, table.c.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def iter_orders(filters=None, after=None, limit=None):
     """
-    Retorna una lista de todas las órdenes.
+    Recorre las órdenes en orden de (created_at, id) sin cargarlas todas en memoria.
+    Parámetros:
+      - filters: diccionario con status, user_id, employee_id, date_from y/o date_to.
+      - after: tupla (created_at, id) de la última orden ya entregada (paginación keyset).
+      - limit: número máximo de órdenes.
+    Los filtros se aplican en SQL y las filas se leen en lotes con un cursor del servidor.
+    La consulta se ejecuta al llamar a la función, así un error se lanza antes de empezar la respuesta.
+    Retorna un generador con una tupla (orden, cursor) por cada orden.
     """
+    query = orders_query(filters, after, limit)
     try:
-        orders = Order.query.all()
-        orders_list = []
-        for order in orders:
-            orders_list.append({
-                "id": order.id,
-                "user_id": order.user_id,
-                "employee_id": order.employee_id,
-                "total": order.total,
-                "status": order.status,
-                "created_at": order.created_at.isoformat() if order.created_at else None
-            })
-        return orders_list
+        result = db.session.execute(query.execution_options(yield_per=ORDER_STREAM_BATCH_SIZE))
     except Exception as e:
         raise Exception(f"Error obteniendo órdenes: {str(e)}")
+    return _iter_order_rows(result)
+
+def _iter_order_rows(result):
+    try:
+        for row in result:
+            yield _order_row_to_dict(row), encode_order_cursor(row.created_at, row.id)
+    finally:
+        result.close()
 
-def update_order_status(order_id, status):
+def get_orders(filters=None):
     """
-    Actualiza el estado de la orden identificada por order_id.
+    Retorna una lista de todas las órdenes (opcionalmente filtradas).
+    Para tablas grandes conviene usar iter_orders, que no carga todo en memoria.
     """
+    return [order for order, _ in iter_orders(filters)]
+
+def orders_with_items_query(filters=None):
+    """
+    Construye la consulta de iter_orders_with_items: órdenes LEFT JOIN ítems con los filtros de órdenes.
+    """
+    orders = Order.__table__
+    items = OrderItem.__table__
+    return select(
+        orders.c.id, orders.c.user_id, orders.c.employee_id, orders.c.total,
+        orders.c.status, orders.c.version, orders.c.menu_version, orders.c.created_at,
+        items.c.id.label("item_id"), items.c.menu_item_id, items.c.quantity, items.c.subtotal
+    ).select_from(
+        orders.outerjoin(items, items.c.order_id == orders.c.id)
+    ).where(*_order_conditions(filters or {})).order_by(orders.c.created_at, orders.c.id, items.c.id)
+
+def iter_orders_with_items(filters=None):
+    """
+    Recorre las órdenes con sus ítems para exportarlas, en orden de (created_at, id).
+    Hace una sola consulta (órdenes LEFT JOIN ítems) leída por lotes con un cursor del servidor,
+    y agrupa las filas consecutivas de cada orden, así solo hay una orden en memoria a la vez.
+    La consulta se ejecuta al llamar a la función, así un error se lanza antes de empezar la respuesta.
+    Retorna un generador con un diccionario por orden con la lista 'items' (vacía si la orden no tiene ítems).
+    """
+    query = orders_with_items_query(filters)
     try:
-        order = Order.query.get(order_id)
-        if not order:
-            raise Exception("Orden no encontrada.")
-        order.status = status
+        result = db.session.execute(
+            query.execution_options(stream_results=True, yield_per=ORDER_STREAM_BATCH_SIZE)
+        )
+    except Exception as e:
+        raise Exception(f"Error exportando órdenes: {str(e)}")
+    return _group_order_item_rows(result)
+
+def _group_order_item_rows(result):
+    try:
+        current = None
+        for row in result:
+            if current is None or current["id"] != row.id:
+                if current is not None:
+                    yield current
+                current = _order_row_to_dict(row)
+                current["items"] = []
+            if row.item_id is not None:
+                current["items"].append({
+                    "menu_item_id": row.menu_item_id,
+                    "quantity": row.quantity,
+                    "subtotal": row.subtotal
+                })
+        if current is not None:
+            yield current
+    finally:
+        result.close()
+
+class OrderVersionConflict(Exception):
+    """
+    La orden cambió desde la versión que tenía el cliente (actualización optimista rechazada).
+    """
+
+    def __init__(self, order_id, current_version):
+        super().__init__(f"La orden {order_id} fue modificada por otra persona (versión actual: {current_version}).")
+        self.order_id = order_id
+        self.current_version = current_version
+
+def _status_update(status):
+    """
+    UPDATE que pasa las órdenes a 'status' guardando el estado anterior e incrementando la versión.
+    previous_status se asigna antes que status: MySQL evalúa las asignaciones en orden y SQLite
+    usa los valores anteriores, así en ambos queda el estado que tenía la fila.
+    """
+    orders = Order.__table__
+    return update(orders).ordered_values(
+        (orders.c.previous_status, orders.c.status),
+        (orders.c.status, status),
+        (orders.c.version, orders.c.version + 1)
+    )
+
+def _compare_and_set_status(order_id, status, version=None):
+    """
+    Cambia el estado solo si el estado actual permite pasar a 'status' y, si se indica 'version',
+    si la orden sigue en esa versión (UPDATE ... WHERE id = ? [AND version = ?] AND status IN (...)).
+    Retorna True si se actualizó la fila.
+    """
+    orders = Order.__table__
+    conditions = [orders.c.id == order_id, orders.c.status.in_(source_statuses(status))]
+    if version is not None:
+        conditions.append(orders.c.version == version)
+    result = db.session.execute(_status_update(status).where(*conditions))
+    return result.rowcount == 1
+
+def update_order_status(order_id, status, expected_version=None):
+    """
+    Actualiza el estado de la orden identificada por order_id con un solo UPDATE condicionado
+    (sin leer la orden antes ni bloquearla). Solo se permiten los cambios de estado definidos
+    en models/order_status.py.
+    Con 'expected_version' (la versión que leyó el cliente) el UPDATE también exige esa versión;
+    si otra persona cambió la orden antes se lanza OrderVersionConflict. Sin 'expected_version'
+    gana el último cambio válido (last-writer-wins).
+    Si el UPDATE no cambia ninguna fila se lee la orden para distinguir entre orden inexistente,
+    conflicto de versión, estado igual al actual (no cambia nada) o cambio no permitido.
+    Si el estado cambia, los datos del evento (estado anterior, usuario, empleado y versión) se leen
+    después del UPDATE, en la misma transacción y con la fila ya bloqueada por él.
+    Retorna un diccionario con order_id, status y la versión.
+    Lanza ValueError si 'status' no es válido o InvalidStatusTransition (también ValueError)
+    si el estado actual no permite el cambio.
+    """
+    validate_status(status)
+    orders = Order.__table__
+    try:
+        if not _compare_and_set_status(order_id, status, expected_version):
+            current = db.session.execute(
+                select(orders.c.status, orders.c.version).where(orders.c.id == order_id)
+            ).first()
+            db.session.rollback()
+            if current is None:
+                raise Exception("Orden no encontrada.")
+            if expected_version is not None and current.version != expected_version:
+                raise OrderVersionConflict(order_id, current.version)
+            if current.status == status:
+                return {"order_id": order_id, "status": status, "version": current.version}
+            raise InvalidStatusTransition(current.status, status)
+        row = db.session.execute(
+            select(orders.c.previous_status, orders.c.user_id, orders.c.employee_id, orders.c.version)
+            .where(orders.c.id == order_id)
+        ).first()
         db.session.commit()
-        return order
+        _publish_status_change(order_id, row.previous_status, status, row.user_id, row.employee_id, row.version)
+        _sync_kitchen_tickets([order_id], status, {order_id: row.version})
+        return {"order_id": order_id, "status": status, "version": row.version}
+    except (OrderVersionConflict, InvalidStatusTransition):
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error actualizando el estado de la orden: {str(e)}")
 
+def bulk_update_order_status(order_ids, status):
+    """
+    Cambia el estado de muchas órdenes con un solo UPDATE ... WHERE id IN (...) AND status IN (...),
+    donde los estados de origen son los que permiten pasar a 'status' según models/order_status.py.
+    Antes se leen las órdenes (una consulta, FOR UPDATE dentro de la misma transacción) para saber
+    cuáles cambian, ya que MySQL no puede devolver las filas actualizadas.
+    Retorna un diccionario con los IDs actualizados ('updated'), los que ya tenían ese estado
+    ('unchanged'), los que no pueden pasar a ese estado ('rejected', con su estado actual)
+    y los que no existen ('not_found').
+    Lanza ValueError si 'status' no es válido.
+    """
+    validate_status(status)
+    orders = Order.__table__
+    sources = source_statuses(status)
+    try:
+        rows = db.session.execute(
+            select(orders.c.id, orders.c.status, orders.c.user_id, orders.c.employee_id, orders.c.version)
+            .where(orders.c.id.in_(order_ids))
+            .with_for_update()
+        ).all()
+        by_id = {row.id: row for row in rows}
+        eligible = [row for row in rows if row.status in sources]
+        if eligible:
+            db.session.execute(
+                _status_update(status)
+                .where(orders.c.id.in_([row.id for row in eligible]), orders.c.status.in_(sources))
+            )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error actualizando el estado de las órdenes: {str(e)}")
+
+    versions = {row.id: row.version + 1 for row in eligible}
+    for row in eligible:
+        _publish_status_change(row.id, row.status, status, row.user_id, row.employee_id, versions[row.id])
+    if eligible:
+        _sync_kitchen_tickets(list(versions), status, versions)
+    return {
+        "status": status,
+        "updated": [order_id for order_id in order_ids if order_id in versions],
+        "unchanged": [order_id for order_id in order_ids if order_id in by_id and by_id[order_id].status == status],
+        "rejected": [
+            {"id": order_id, "status": by_id[order_id].status}
+            for order_id in order_ids
+            if order_id in by_id and order_id not in versions and by_id[order_id].status != status
+        ],
+        "not_found": [order_id for order_id in order_ids if order_id not in by_id]
+    }
+
+def _order_details_to_dict(order, archived=False, snapshots=None):
+    """
+    Convierte una orden (de 'orders' u 'orders_archive') con sus ítems ya cargados en diccionario.
+    Si la orden tiene versión del menú, cada ítem incluye el nombre y precio del platillo
+    tal como estaban en esa versión (se leen de la caché de versiones del menú, o de 'snapshots'
+    si ya se cargaron con get_menu_snapshots).
+    """
+    if not order.menu_version:
+        snapshot = None
+    elif snapshots is not None:
+        snapshot = snapshots.get(order.menu_version)
+    else:
+        snapshot = get_menu_snapshot(order.menu_version)
+    item_list = []
+    for item in sorted(order.items, key=lambda item: item.id):
+        item_data = {
+            "menu_item_id": item.menu_item_id,
+            "quantity": item.quantity,
+            "subtotal": item.subtotal,
+            "created_at": item.created_at.isoformat() if item.created_at else None
+        }
+        menu_item = snapshot["items"].get(item.menu_item_id) if snapshot else None
+        if menu_item:
+            item_data["name"] = menu_item.get("name")
+            item_data["unit_price"] = menu_item.get("price")
+        item_list.append(item_data)
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "employee_id": order.employee_id,
+        "total": order.total,
+        "status": order.status,
+        "version": getattr(order, "version", None),
+        "menu_version": order.menu_version,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "archived": archived,
+        "items": item_list
+    }
+
 def get_order_details(order_id):
     """
     Retorna los detalles de una orden, incluyendo sus ítems.
+    La orden y sus ítems se cargan con una sola consulta (JOIN). Si la orden ya no está
+    en 'orders' se busca en las tablas de archivo.
     """
     try:
-        order = Order.query.get(order_id)
-        if not order:
-            return None
-        items = OrderItem.query.filter_by(order_id=order.id).all()
-        item_list = []
-        for item in items:
-            item_list.append({
-                "menu_item_id": item.menu_item_id,
-                "quantity": item.quantity,
-                "subtotal": item.subtotal,
-                "created_at": item.created_at.isoformat() if item.created_at else None
-            })
-        details = {
-            "id": order.id,
-            "user_id": order.user_id,
-            "employee_id": order.employee_id,
-            "total": order.total,
-            "status": order.status,
-            "created_at": order.created_at.isoformat() if order.created_at else None,
-            "items": item_list
-        }
-        return details
+        order = db.session.get(Order, order_id, options=[joinedload(Order.items)])
+        if order:
+            return _order_details_to_dict(order)
+        order = db.session.get(OrderArchive, order_id, options=[joinedload(OrderArchive.items)])
+        if order:
+            return _order_details_to_dict(order, archived=True)
+        return None
     except Exception as e:
         raise Exception(f"Error obteniendo los detalles de la orden: {str(e)}")
 
+def get_orders_details(order_ids):
+    """
+    Retorna los detalles de varias órdenes con sus ítems usando dos consultas en total
+    (órdenes con WHERE id IN (...) y sus ítems con otro IN), sin importar cuántas sean.
+    Las que no están en 'orders' se buscan en las tablas de archivo con otras dos consultas,
+    y las versiones del menú que no estén en caché se leen juntas con una consulta más.
+    Retorna una tupla (ordenes, no_encontradas) respetando el orden de 'order_ids'.
+    """
+    try:
+        orders = Order.query.options(selectinload(Order.items)).filter(Order.id.in_(order_ids)).all()
+        found = {order.id for order in orders}
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        archived = []
+        if missing:
+            archived = OrderArchive.query.options(selectinload(OrderArchive.items)).filter(OrderArchive.id.in_(missing)).all()
+        snapshots = get_menu_snapshots([order.menu_version for order in orders + archived if order.menu_version])
+        by_id = {order.id: _order_details_to_dict(order, snapshots=snapshots) for order in orders}
+        by_id.update((order.id, _order_details_to_dict(order, archived=True, snapshots=snapshots)) for order in archived)
+        details = [by_id[order_id] for order_id in order_ids if order_id in by_id]
+        not_found = [order_id for order_id in order_ids if order_id not in by_id]
+        return details, not_found
+    except Exception as e:
+        raise Exception(f"Error obteniendo los detalles de las órdenes: {str(e)}")
+
+def _delete_orders_chunk(order_ids):
+    """
+    Borra las órdenes de 'order_ids' con sus pagos e ítems en una transacción: un DELETE por tabla.
+    Los hijos se borran explícitamente además del ON DELETE CASCADE, así también funciona
+    en bases de datos que aún no tienen la cascada (o en SQLite sin llaves foráneas activas).
+    Retorna los IDs de las órdenes borradas.
+    """
+    orders = Order.__table__
+    found = db.session.execute(select(orders.c.id).where(orders.c.id.in_(order_ids))).scalars().all()
+    if found:
+        payments = Payment.__table__
+        items = OrderItem.__table__
+        db.session.execute(delete(payments).where(payments.c.order_id.in_(found)))
+        db.session.execute(delete(items).where(items.c.order_id.in_(found)))
+        db.session.execute(delete(orders).where(orders.c.id.in_(found)))
+    db.session.commit()
+    for order_id in found:
+        kitchen_queue.remove(order_id)
+    return found
+
 def delete_order(order_id):
     """
-    Elimina una orden y sus ítems asociados.
+    Elimina una orden junto con sus ítems y pagos.
     """
     try:
-        order = Order.query.get(order_id)
-        if not order:
+        if not _delete_orders_chunk([order_id]):
             raise Exception("Orden no encontrada.")
-        # Eliminar ítems asociados
-        OrderItem.query.filter_by(order_id=order.id).delete()
-        db.session.delete(order)
-        db.session.commit()
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error eliminando la orden: {str(e)}")
+
+def delete_orders(order_ids=None, status=None, older_than_days=None, chunk_size=ORDER_DELETE_CHUNK_SIZE):
+    """
+    Elimina muchas órdenes (con sus ítems y pagos) por lotes de 'chunk_size', cada lote en su propia
+    transacción con un DELETE por tabla, en lugar de una petición por orden.
+    Se indican los IDs ('order_ids') o un filtro por estado cerrado (completada o cancelada) y,
+    opcionalmente, antigüedad en días; el filtro nunca borra órdenes abiertas. El filtro toma
+    los IDs de cada lote con FOR UPDATE SKIP LOCKED y se repite hasta que no quedan órdenes.
+    Retorna un diccionario con las órdenes borradas ('deleted'), los lotes ('chunks') y,
+    si se dieron IDs, los que no existían ('not_found').
+    Lanza ValueError si no se indica ningún criterio o si el filtro no tiene un estado cerrado.
+    """
+    if not order_ids and status is None and older_than_days is None:
+        raise ValueError("Se deben indicar 'ids' o un filtro por 'status' y 'older_than_days' (opcional).")
+    if not order_ids and status not in CLOSED_STATUSES:
+        raise ValueError(
+            f"El borrado por filtro requiere 'status' con un estado cerrado: {', '.join(CLOSED_STATUSES)}."
+        )
+    summary = {"deleted": 0, "chunks": 0}
+    try:
+        if order_ids:
+            deleted = set()
+            for start in range(0, len(order_ids), chunk_size):
+                found = _delete_orders_chunk(order_ids[start:start + chunk_size])
+                deleted.update(found)
+                summary["deleted"] += len(found)
+                summary["chunks"] += 1
+            summary["not_found"] = [order_id for order_id in order_ids if order_id not in deleted]
+            return summary
+
+        orders = Order.__table__
+        conditions = [orders.c.status == status]
+        if older_than_days is not None:
+            conditions.append(orders.c.created_at < datetime.now() - timedelta(days=older_than_days))
+        query = select(orders.c.id).where(*conditions).order_by(orders.c.id).limit(chunk_size).with_for_update(skip_locked=True)
+        while True:
+            found = _delete_orders_chunk(db.session.execute(query).scalars().all())
+            if not found:
+                break
+            summary["deleted"] += len(found)
+            summary["chunks"] += 1
+            if len(found) < chunk_size:
+                break
+        return summary
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error eliminando las órdenes: {str(e)}")
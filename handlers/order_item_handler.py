@@ -1,10 +1,35 @@
 # handlers/order_item_handler.py
+from sqlalchemy import select, update, func, bindparam
+from config import ORDER_TOTALS_VERIFY_CHUNK_SIZE, ORDER_ITEM_BULK_CHUNK_SIZE
 from db_init import db
+from handlers.menu_handler import get_menu_prices
+from handlers.order_handler import refresh_kitchen_tickets
+from models.order_model import Order
 from models.order_item_model import OrderItem
+from models.order_archive_model import OrderItemArchive
+from models.order_status import CLOSED_STATUSES
+
+def adjust_order_total(order_id, delta):
+    """
+    Suma 'delta' a orders.total con un UPDATE atómico (total = total + delta) en la transacción actual
+    e incrementa la versión de la orden, aunque 'delta' sea 0: todo cambio en los ítems de una orden
+    incrementa su versión una vez (igual que create_order_items).
+    No confirma; quien llama hace el commit junto con el cambio del ítem.
+    """
+    if not order_id:
+        return
+    orders = Order.__table__
+    db.session.execute(
+        update(orders).where(orders.c.id == order_id).values(
+            total=orders.c.total + (delta or 0),
+            version=orders.c.version + 1
+        )
+    )
 
 def create_order_item(order_id, menu_item_id, quantity, price):
     """
-    Crea un nuevo ítem para una orden.
+    Crea un nuevo ítem para una orden y suma su subtotal al total de la orden en la misma transacción.
+    Después del commit se actualiza el ticket de cocina de la orden.
     Se espera:
       - order_id: ID de la orden a la que se añade el ítem.
       - menu_item_id: ID del platillo en el menú.
@@ -21,19 +46,134 @@ def create_order_item(order_id, menu_item_id, quantity, price):
             subtotal=subtotal
         )
         db.session.add(order_item)
+        db.session.flush()
+        order_item_id = order_item.id
+        adjust_order_total(order_id, subtotal)
         db.session.commit()
-        return order_item.id
+        refresh_kitchen_tickets([order_id])
+        return order_item_id
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error creando el ítem de la orden: {str(e)}")
 
+def _validate_order_item_row(row):
+    """
+    Valida la forma de una fila de la carga masiva de ítems sin consultar la base de datos.
+    Retorna la lista de errores.
+    """
+    if not isinstance(row, dict):
+        return ["La fila debe ser un objeto con order_id, menu_item_id y quantity"]
+    errors = []
+    for field in ("order_id", "menu_item_id"):
+        value = row.get(field)
+        if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+            errors.append(f"'{field}' no es válido")
+    quantity = row.get("quantity", 1)
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        errors.append("'quantity' debe ser un entero mayor a 0")
+    return errors
+
+def create_order_items(rows, chunk_size=ORDER_ITEM_BULK_CHUNK_SIZE):
+    """
+    Agrega muchos ítems a una o varias órdenes en una sola transacción
+    (por ejemplo una ronda de bebidas para una mesa).
+    Cada fila debe tener order_id, menu_item_id y quantity (opcional, por defecto 1); el precio
+    se toma del menú con una sola consulta para todas las filas, no del cliente.
+    Primero se validan todas las filas (las órdenes deben existir y no estar cerradas, y los platillos
+    deben existir y estar disponibles); si alguna tiene errores no se inserta ninguna.
+    Las órdenes se leen con FOR UPDATE, así no se pueden cerrar, archivar ni borrar antes del INSERT.
+    Los ítems se insertan en lotes de 'chunk_size' con executemany y el total de cada orden se
+    actualiza una sola vez (un UPDATE total = total + :delta por orden, también con executemany),
+    incrementando su versión; después del commit se actualizan sus tickets de cocina.
+    Retorna una tupla (creados, resultados, ordenes) donde 'resultados' tiene un diccionario por fila
+    con su número ('row', empezando en 1), su 'status' ('created', 'valid' o 'error') y sus 'errors',
+    y 'ordenes' tiene por cada orden los ítems agregados ('items') y el monto sumado ('amount').
+    """
+    results = []
+    for number, row in enumerate(rows, start=1):
+        errors = _validate_order_item_row(row)
+        results.append({"row": number, "status": "error", "errors": errors} if errors else {"row": number, "status": "valid"})
+    valid = [row for row, result in zip(rows, results) if result["status"] == "valid"]
+
+    orders = Order.__table__
+    order_status = {}
+    if valid:
+        try:
+            order_status = dict(db.session.execute(
+                select(orders.c.id, orders.c.status)
+                .where(orders.c.id.in_({row["order_id"] for row in valid}))
+                .with_for_update()
+            ).all())
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Error creando los ítems de la orden: {str(e)}")
+    prices = get_menu_prices([row["menu_item_id"] for row in valid])
+
+    values = []
+    amounts = {}
+    for row, result in zip(rows, results):
+        if result["status"] != "valid":
+            continue
+        errors = []
+        status = order_status.get(row["order_id"])
+        if status is None:
+            errors.append(f"La orden {row['order_id']} no existe")
+        elif status in CLOSED_STATUSES:
+            errors.append(f"La orden {row['order_id']} está cerrada ({status})")
+        menu_item = prices.get(row["menu_item_id"])
+        if menu_item is None:
+            errors.append(f"El platillo {row['menu_item_id']} no existe")
+        elif not menu_item["available"]:
+            errors.append(f"El platillo {row['menu_item_id']} no está disponible")
+        if errors:
+            result.update(status="error", errors=errors)
+            continue
+        quantity = row.get("quantity", 1)
+        subtotal = menu_item["price"] * quantity
+        values.append({
+            "order_id": row["order_id"],
+            "menu_item_id": row["menu_item_id"],
+            "quantity": quantity,
+            "subtotal": float(subtotal)
+        })
+        items, amount = amounts.get(row["order_id"], (0, 0))
+        amounts[row["order_id"]] = (items + 1, amount + subtotal)
+    if not values or len(values) < len(results):
+        db.session.rollback()
+        return 0, results, []
+
+    add_total = update(orders).where(orders.c.id == bindparam("order_id")).values(
+        total=orders.c.total + bindparam("delta"),
+        version=orders.c.version + 1
+    )
+    try:
+        insert = OrderItem.__table__.insert()
+        for start in range(0, len(values), chunk_size):
+            db.session.execute(insert, values[start:start + chunk_size])
+        db.session.execute(
+            add_total,
+            [{"order_id": order_id, "delta": float(amount)} for order_id, (_, amount) in amounts.items()]
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error creando los ítems de la orden: {str(e)}")
+    refresh_kitchen_tickets(list(amounts))
+    for result in results:
+        result["status"] = "created"
+    return len(values), results, [
+        {"order_id": order_id, "items": items, "amount": float(amount)}
+        for order_id, (items, amount) in amounts.items()
+    ]
+
 def get_order_item(order_item_id):
     """
     Obtiene los detalles de un ítem de la orden por su ID.
+    Si el ítem no está en 'order_items' se busca en la tabla de archivo.
     Retorna un diccionario con los datos o None si no se encuentra.
     """
     try:
-        order_item = OrderItem.query.get(order_item_id)
+        order_item = OrderItem.query.get(order_item_id) or OrderItemArchive.query.get(order_item_id)
         if not order_item:
             return None
         return {
@@ -50,10 +190,13 @@ def get_order_item(order_item_id):
 def get_order_items_by_order(order_id):
     """
     Obtiene todos los ítems asociados a una orden dada.
+    Si la orden no tiene ítems en 'order_items' se buscan en la tabla de archivo.
     Retorna una lista de diccionarios.
     """
     try:
         order_items = OrderItem.query.filter_by(order_id=order_id).all()
+        if not order_items:
+            order_items = OrderItemArchive.query.filter_by(order_id=order_id).all()
         return [{
             "id": item.id,
             "order_id": item.order_id,
@@ -69,6 +212,9 @@ def update_order_item(order_item_id, data):
     """
     Actualiza un ítem de la orden.
     Se puede actualizar la cantidad y, opcionalmente, recalcular el subtotal si se proporciona el precio.
+    El ítem se lee con FOR UPDATE, así la diferencia se calcula sobre el subtotal vigente.
+    Si el subtotal cambia, la diferencia se aplica al total de la orden en la misma transacción;
+    la versión de la orden se incrementa siempre.
     Se espera que 'data' contenga:
       - quantity (opcional)
       - price (opcional, para recalcular el subtotal)
@@ -76,31 +222,89 @@ def update_order_item(order_item_id, data):
     Retorna el ID del ítem actualizado.
     """
     try:
-        order_item = OrderItem.query.get(order_item_id)
+        # FOR UPDATE: otra petición sobre el mismo ítem espera y ve el subtotal ya cambiado
+        order_item = db.session.get(OrderItem, order_item_id, with_for_update=True, populate_existing=True)
         if not order_item:
             raise Exception("Ítem de la orden no encontrado")
+        previous_subtotal = order_item.subtotal
         if "quantity" in data:
             order_item.quantity = data["quantity"]
             if "price" in data:
                 order_item.subtotal = data["quantity"] * data["price"]
         if "menu_item_id" in data:
             order_item.menu_item_id = data["menu_item_id"]
+        order_item_id, order_id = order_item.id, order_item.order_id
+        adjust_order_total(order_id, order_item.subtotal - previous_subtotal)
         db.session.commit()
-        return order_item.id
+        refresh_kitchen_tickets([order_id])
+        return order_item_id
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error actualizando el ítem de la orden: {str(e)}")
 
 def delete_order_item(order_item_id):
     """
-    Elimina un ítem de la orden dado su ID.
+    Elimina un ítem de la orden dado su ID y resta su subtotal del total de la orden
+    en la misma transacción. Después del commit se actualiza el ticket de cocina de la orden.
     """
     try:
-        order_item = OrderItem.query.get(order_item_id)
+        # FOR UPDATE: así dos borrados simultáneos no restan el subtotal dos veces
+        order_item = db.session.get(OrderItem, order_item_id, with_for_update=True, populate_existing=True)
         if not order_item:
             raise Exception("Ítem de la orden no encontrado")
+        order_id = order_item.order_id
+        adjust_order_total(order_id, -order_item.subtotal)
         db.session.delete(order_item)
         db.session.commit()
+        refresh_kitchen_tickets([order_id])
     except Exception as e:
         db.session.rollback()
         raise Exception(f"Error eliminando el ítem de la orden: {str(e)}")
+
+def verify_order_totals(fix=False, chunk_size=ORDER_TOTALS_VERIFY_CHUNK_SIZE, max_reported=100):
+    """
+    Recalcula en bloque el total de cada orden sumando sus ítems y lo compara con orders.total.
+    Recorre las órdenes por lotes de 'chunk_size' (una consulta con GROUP BY por lote, paginada por id).
+    Con fix=True corrige las diferencias con un UPDATE por lote (executemany) y confirma cada lote.
+    Retorna un diccionario con las órdenes revisadas ('checked'), las que no cuadran ('mismatched'),
+    las corregidas ('fixed') y hasta 'max_reported' ejemplos en 'mismatches'.
+    """
+    orders = Order.__table__
+    items = OrderItem.__table__
+    expected = func.coalesce(func.sum(items.c.subtotal), 0).label("expected")
+    fix_total = update(orders).where(orders.c.id == bindparam("order_id")).values(total=bindparam("expected"))
+    summary = {"checked": 0, "mismatched": 0, "fixed": 0, "mismatches": []}
+    last_id = 0
+    try:
+        while True:
+            rows = db.session.execute(
+                select(orders.c.id, orders.c.total, expected)
+                .select_from(orders.outerjoin(items, items.c.order_id == orders.c.id))
+                .where(orders.c.id > last_id)
+                .group_by(orders.c.id, orders.c.total)
+                .order_by(orders.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            summary["checked"] += len(rows)
+            wrong = [
+                {"order_id": row.id, "total": row.total, "expected": round(float(row.expected), 2)}
+                for row in rows
+                if row.total is None or abs(row.total - float(row.expected)) >= 0.005
+            ]
+            summary["mismatched"] += len(wrong)
+            summary["mismatches"].extend(wrong[:max_reported - len(summary["mismatches"])])
+            if fix and wrong:
+                db.session.execute(fix_total, [{"order_id": w["order_id"], "expected": w["expected"]} for w in wrong])
+                db.session.commit()
+                summary["fixed"] += len(wrong)
+            else:
+                db.session.rollback()
+            if len(rows) < chunk_size:
+                break
+        return summary
+    except Exception as e:
+        db.session.rollback()
+        raise Exception(f"Error verificando los totales de las órdenes: {str(e)}")
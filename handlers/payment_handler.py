@@ -2,6 +2,7 @@
 from datetime import datetime
 from db_init import db
 from models.payment_model import Payment
+from models.order_archive_model import PaymentArchive
 from sqlalchemy import text
 
 def create_payment(data):
@@ -31,10 +32,11 @@ def create_payment(data):
 def get_payment(payment_id):
     """
     Obtiene un pago por su ID.
+    Si el pago no está en 'payments' se busca en la tabla de archivo.
     Retorna un diccionario con los datos del pago o None si no existe.
     """
     try:
-        payment = Payment.query.get(payment_id)
+        payment = Payment.query.get(payment_id) or PaymentArchive.query.get(payment_id)
         if payment is None:
             return None
         return payment.to_dict()
@@ -44,10 +46,13 @@ def get_payment(payment_id):
 def get_payments_by_order(order_id):
     """
     Obtiene todos los pagos asociados a una orden.
+    Si la orden no tiene pagos en 'payments' se buscan en la tabla de archivo.
     Retorna una lista de diccionarios.
     """
     try:
         payments = Payment.query.filter_by(order_id=order_id).all()
+        if not payments:
+            payments = PaymentArchive.query.filter_by(order_id=order_id).all()
         return [payment.to_dict() for payment in payments]
     except Exception as e:
         raise Exception(f"Error al obtener los pagos: {str(e)}")
@@ -0,0 +1,17 @@
+# models/idempotency_key_model.py
+from db_init import db
+
+class IdempotencyKey(db.Model):
+    """
+    Respuesta guardada para un Idempotency-Key, compartida por todos los workers.
+    'key_hash' es el hash de la ruta y la clave; 'fingerprint' es el hash del cuerpo de la petición.
+    Mientras la petición original se ejecuta 'status_code' es NULL.
+    """
+    __tablename__ = 'idempotency_keys'
+    key_hash = db.Column(db.String(32), primary_key=True)
+    fingerprint = db.Column(db.String(32), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    body = db.Column(db.LargeBinary(length=16777215), nullable=True)
+    mimetype = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -3,10 +3,15 @@ from db_init import db
 
 class MenuItem(db.Model):
     __tablename__ = 'menu_items'
+    __table_args__ = (
+        # Listado por sección: WHERE category = ? [AND available = ?]
+        db.Index('ix_menu_items_category_available', 'category', 'available'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     available = db.Column(db.Boolean, default=True)
+    category = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
 
@@ -0,0 +1,19 @@
+# models/menu_snapshot_model.py
+from sqlalchemy.dialects import mysql
+from db_init import db
+
+class MenuSnapshot(db.Model):
+    """
+    Copia inmutable del menú completo tal como estaba en un momento dado.
+    El id funciona como versión del menú y se guarda en cada orden (orders.menu_version).
+    'payload' es el JSON del menú ya serializado; 'content_hash' es único, así el mismo menú
+    siempre tiene la misma versión aunque dos workers lo guarden al mismo tiempo.
+    'activated_at' es la última vez que esta versión pasó a ser la vigente (un menú puede volver
+    a una versión anterior); la vigente es la de 'activated_at' más reciente.
+    """
+    __tablename__ = 'menu_snapshots'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    content_hash = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    payload = db.Column(db.LargeBinary(length=16777215), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    activated_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=True)
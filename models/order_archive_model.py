@@ -0,0 +1,51 @@
+# models/order_archive_model.py
+from db_init import db
+
+class OrderArchive(db.Model):
+    """
+    Órdenes cerradas y antiguas movidas fuera de 'orders' por el archivador.
+    Tiene las mismas columnas que Order (y conserva su id) más la fecha en que se archivó.
+    """
+    __tablename__ = 'orders_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    employee_id = db.Column(db.Integer, nullable=True)
+    total = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    menu_version = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+
+    items = db.relationship('OrderItemArchive', backref='order', lazy=True, passive_deletes=True)
+
+class OrderItemArchive(db.Model):
+    """
+    Ítems de las órdenes archivadas, con las mismas columnas (e id) que OrderItem.
+    """
+    __tablename__ = 'order_items_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id', ondelete='CASCADE'), index=True)
+    menu_item_id = db.Column(db.Integer)
+    quantity = db.Column(db.Integer, nullable=False)
+    subtotal = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+class PaymentArchive(db.Model):
+    """
+    Pagos de las órdenes archivadas, con las mismas columnas (e id) que Payment.
+    """
+    __tablename__ = 'payments_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id', ondelete='CASCADE'), nullable=False, index=True)
+    payment_method = db.Column(db.String(50), nullable=False)
+    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    paid_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "payment_method": self.payment_method,
+            "amount": float(self.amount),
+            "paid_at": self.paid_at.strftime("%Y-%m-%d %H:%M:%S") if self.paid_at else None
+        }
@@ -2,12 +2,26 @@ from db_init import db
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Listados y filtros de GET /order/: keyset por (created_at, id), por estado y por usuario
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     employee_id = db.Column(db.Integer, nullable=True)
     total = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')
+    # Se incrementa en cada cambio de estado y en cada escritura de sus ítems (una vez por orden);
+    # permite actualizaciones optimistas (UPDATE ... WHERE version = ?)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Estado anterior, guardado por el mismo UPDATE que cambia el estado (para el evento del cambio)
+    previous_status = db.Column(db.String(20), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    # Versión del menú (menu_snapshots.id) vigente cuando se creó la orden
+    menu_version = db.Column(db.Integer, db.ForeignKey('menu_snapshots.id'), nullable=True)
 
-    items = db.relationship('OrderItem', backref='order', lazy=True)
+    # Los ítems (y los pagos) se borran en la base de datos con ON DELETE CASCADE
+    items = db.relationship('OrderItem', backref='order', lazy=True, passive_deletes=True)
 
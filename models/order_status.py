@@ -0,0 +1,57 @@
+# models/order_status.py
+
+# Estados de una orden
+PENDING = 'pendiente'
+IN_PREPARATION = 'en_preparacion'
+READY = 'lista'
+COMPLETED = 'completada'
+CANCELLED = 'cancelada'
+
+# Valor por defecto del modelo en órdenes antiguas; se trata igual que 'pendiente'
+LEGACY_PENDING = 'pending'
+
+# Órdenes que la cocina todavía debe atender
+ACTIVE_STATUSES = (LEGACY_PENDING, PENDING, IN_PREPARATION)
+CLOSED_STATUSES = (COMPLETED, CANCELLED)
+
+# Cambios de estado permitidos: estado actual -> estados a los que puede pasar
+TRANSITIONS = {
+    LEGACY_PENDING: (IN_PREPARATION, READY, COMPLETED, CANCELLED),
+    PENDING: (IN_PREPARATION, READY, COMPLETED, CANCELLED),
+    IN_PREPARATION: (READY, COMPLETED, CANCELLED),
+    READY: (COMPLETED,),
+    COMPLETED: (),
+    CANCELLED: ()
+}
+
+STATUSES = (PENDING, IN_PREPARATION, READY, COMPLETED, CANCELLED)
+
+class InvalidStatusTransition(ValueError):
+    """
+    El cambio de estado no está permitido por TRANSITIONS.
+    """
+
+    def __init__(self, current, new):
+        allowed = ", ".join(TRANSITIONS.get(current, ())) or "ninguno"
+        super().__init__(f"No se puede pasar una orden de '{current}' a '{new}' (permitidos: {allowed}).")
+        self.current = current
+        self.new = new
+
+def validate_status(status):
+    """
+    Lanza ValueError si 'status' no es uno de los estados que se pueden asignar.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Estado no válido: '{status}'. Estados válidos: {', '.join(STATUSES)}.")
+
+def can_transition(current, new):
+    """
+    Indica si una orden en 'current' puede pasar a 'new'. Repetir el mismo estado siempre se permite.
+    """
+    return current == new or new in TRANSITIONS.get(current, ())
+
+def source_statuses(new):
+    """
+    Retorna los estados desde los que se puede pasar a 'new' (sin incluir 'new').
+    """
+    return tuple(current for current, targets in TRANSITIONS.items() if new in targets)
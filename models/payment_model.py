@@ -1,13 +1,13 @@
 # models/payment_model.py
 from db_init import db
-from sqlalchemy import Column, Integer, String, Numeric, DateTime
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey
 from datetime import datetime
 
 class Payment(db.Model):
     __tablename__ = 'payments'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    order_id = Column(Integer, nullable=False)  # Se recomienda una ForeignKey si se necesita, e.g., db.ForeignKey('orders.id')
+    order_id = Column(Integer, ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
     payment_method = Column(String(50), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     paid_at = Column(DateTime, default=datetime.utcnow)
@@ -1,7 +1,14 @@
 # routes/db_routes.py
-from flask import Blueprint, jsonify
+import json
+import time
+import click
+from flask import Blueprint, request, jsonify
 from db_init import db  # Cambiamos la importación para evitar el ciclo
 from models.menu_item_model import MenuItem
+from handlers.archive_handler import archive_closed_orders
+from handlers.order_item_handler import verify_order_totals
+from handlers.migration_handler import migrate_schema, check_query_plans
+from utils.helpers import parse_bool
 
 db_bp = Blueprint('db', __name__)
 
@@ -12,3 +19,173 @@ def create_tables():
         return jsonify({"message": "Tablas creadas con éxito."})
     except Exception as e:
         return jsonify({"error": str(e)})
+
+@db_bp.route("/migrate", methods=["POST"])
+def route_migrate():
+    """
+    Actualizar una base de datos existente al esquema de los modelos.
+    create_tables solo crea tablas nuevas; esta ruta además agrega columnas, índices y llaves
+    foráneas que falten en las tablas existentes. También disponible como: flask db migrate
+    ---
+    tags:
+      - Database
+    parameters:
+      - name: dry_run
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Solo listar los pasos pendientes.
+    responses:
+      200:
+        description: Todos los pasos se aplicaron (o están pendientes en dry_run).
+      400:
+        description: Parámetros no válidos.
+      500:
+        description: Algún paso falló; el detalle viene en 'steps'.
+    """
+    try:
+        dry_run = parse_bool(request.args.get("dry_run", "false"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        result = migrate_schema(dry_run=dry_run)
+        return jsonify(result), 200 if result["ok"] else 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@db_bp.route("/check_query_plans", methods=["GET"])
+def route_check_query_plans():
+    """
+    Revisar que las consultas principales de órdenes, ítems, pagos y menú usen índices.
+    También disponible como: flask db check-plans (termina con código 1 si alguna recorre la tabla completa)
+    ---
+    tags:
+      - Database
+    responses:
+      200:
+        description: Resultado de cada consulta; 'ok' es false si alguna recorre una tabla completa.
+      500:
+        description: Error interno.
+    """
+    try:
+        return jsonify(check_query_plans()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@db_bp.cli.command("migrate")
+@click.option("--dry-run", is_flag=True, help="Solo listar los pasos pendientes.")
+def migrate_command(dry_run):
+    """Agrega a la base de datos las tablas, columnas, índices y llaves foráneas que falten."""
+    result = migrate_schema(dry_run=dry_run)
+    for step in result["steps"]:
+        click.echo(f"{step['status']:8} {step['action']:16} {step['table']}.{step['name']} {step.get('error', '')}")
+    if not result["steps"]:
+        click.echo("El esquema está al día.")
+    if not result["ok"]:
+        raise SystemExit(1)
+
+@db_bp.cli.command("check-plans")
+def check_plans_command():
+    """Falla si alguna consulta principal recorre una tabla completa."""
+    result = check_query_plans()
+    for check in result["checks"]:
+        click.echo(f"{'ok' if check['ok'] else 'FULL SCAN':9} {check['name']} {json.dumps(check['full_scans'], default=str)}")
+    if not result["ok"]:
+        raise SystemExit(1)
+
+@db_bp.route("/archive_orders", methods=["POST"])
+def archive_orders():
+    """
+    Archivar ahora las órdenes cerradas antiguas (además del trabajo programado flask db archive-orders).
+    ---
+    tags:
+      - Database
+    parameters:
+      - name: older_than_days
+        in: query
+        type: integer
+        required: false
+        description: Antigüedad mínima en días (por defecto ORDER_ARCHIVE_AFTER_DAYS).
+      - name: max_chunks
+        in: query
+        type: integer
+        required: false
+        description: Máximo de lotes a procesar en esta petición.
+    responses:
+      200:
+        description: Órdenes archivadas y lotes procesados.
+      400:
+        description: Parámetros no válidos.
+      500:
+        description: Error interno.
+    """
+    try:
+        options = {}
+        for name in ("older_than_days", "max_chunks"):
+            value = request.args.get(name)
+            if value is not None:
+                if not value.isdigit():
+                    raise ValueError(f"El parámetro '{name}' debe ser un entero")
+                options[name] = int(value)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(archive_closed_orders(**options)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@db_bp.cli.command("archive-orders")
+@click.option("--older-than-days", type=click.IntRange(min=0), default=None, help="Antigüedad mínima en días.")
+@click.option("--max-chunks", type=click.IntRange(min=1), default=None, help="Máximo de lotes por ejecución.")
+@click.option("--every", type=click.IntRange(min=1), default=None, help="Repetir cada N segundos sin terminar.")
+def archive_orders_command(older_than_days, max_chunks, every):
+    """Archiva las órdenes cerradas antiguas. Se programa una sola vez (cron o un proceso con --every), no por worker."""
+    options = {"max_chunks": max_chunks}
+    if older_than_days is not None:
+        options["older_than_days"] = older_than_days
+    while True:
+        try:
+            result = archive_closed_orders(**options)
+            click.echo(f"archivadas {result['archived']} órdenes en {result['chunks']} lotes (antes de {result['cutoff']})")
+        except Exception as e:
+            if not every:
+                raise
+            click.echo(f"error {e}", err=True)
+        finally:
+            db.session.remove()
+        if not every:
+            break
+        time.sleep(every)
+
+@db_bp.route("/verify_order_totals", methods=["POST"])
+def route_verify_order_totals():
+    """
+    Verificar (y opcionalmente corregir) orders.total contra la suma de sus ítems.
+    Los totales se mantienen al crear, editar o eliminar ítems; este proceso es la revisión en bloque.
+    ---
+    tags:
+      - Database
+    parameters:
+      - name: fix
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Corregir los totales que no cuadran.
+    responses:
+      200:
+        description: Órdenes revisadas, con diferencias y corregidas.
+      400:
+        description: Parámetros no válidos.
+      500:
+        description: Error interno.
+    """
+    try:
+        fix = parse_bool(request.args.get("fix", "false"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(verify_order_totals(fix=fix)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
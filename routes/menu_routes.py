@@ -1,25 +1,135 @@
 # routes/menu_routes.py
-from flask import Blueprint, request, jsonify
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from flask import Blueprint, Response, request, jsonify, current_app
+from config import MENU_PAGE_SIZE, MENU_MAX_PAGE_SIZE, MENU_BULK_MAX_ROWS
+from utils.event_stream import parse_last_event_id
+from utils.helpers import parse_bool, iter_ndjson, iter_csv
 from handlers.menu_handler import (
-    get_all_menu_items,
+    MENU_FIELDS,
+    list_menu_items,
+    normalize_category,
+    get_menu_section_json,
+    get_all_menu_items_json,
+    get_menu_etag,
     get_menu_item,
+    search_menu_items,
     add_menu_item,
+    bulk_add_menu_items,
     update_menu_item,
-    delete_menu_item
+    delete_menu_item,
+    set_menu_items_availability,
+    get_menu_snapshot,
+    menu_events,
+    get_menu_cache_stats
 )
 
 menu_bp = Blueprint('menu', __name__)
 
+LISTING_ARGS = ("fields", "cursor", "limit", "available", "min_price", "max_price")
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def _parse_price(name, value):
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"El parámetro '{name}' debe ser un número")
+    # Decimal acepta NaN e Infinity, que no se pueden comparar en SQL
+    if not price.is_finite():
+        raise ValueError(f"El parámetro '{name}' debe ser un número")
+    return price
+
+def _parse_listing_args(args):
+    """
+    Convierte los parámetros de paginación y filtros de GET /menu/ en argumentos para list_menu_items.
+    Lanza ValueError si algún parámetro no es válido.
+    """
+    options = {"limit": MENU_PAGE_SIZE}
+    if "fields" in args:
+        fields = [name.strip() for name in args["fields"].split(",") if name.strip()]
+        unknown = [name for name in fields if name not in MENU_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos no válidos: {', '.join(unknown)}")
+        options["fields"] = fields
+    if "cursor" in args:
+        if not args["cursor"].isdigit():
+            raise ValueError("El parámetro 'cursor' debe ser un ID de platillo")
+        options["cursor"] = int(args["cursor"])
+    if "limit" in args:
+        if not args["limit"].isdigit() or not 1 <= int(args["limit"]) <= MENU_MAX_PAGE_SIZE:
+            raise ValueError(f"El parámetro 'limit' debe estar entre 1 y {MENU_MAX_PAGE_SIZE}")
+        options["limit"] = int(args["limit"])
+    if "available" in args:
+        options["available"] = parse_bool(args["available"])
+    if "min_price" in args:
+        options["min_price"] = _parse_price("min_price", args["min_price"])
+    if "max_price" in args:
+        options["max_price"] = _parse_price("max_price", args["max_price"])
+    if args.get("category"):
+        options["category"] = normalize_category(args["category"])
+    return options
+
 @menu_bp.route('/', methods=['GET'])
 def route_get_all_menu_items():
     """
     Obtener todos los platillos del menú.
+    Sin parámetros devuelve el menú completo con un ETag fuerte con la versión del menú;
+    si el cliente envía If-None-Match con esa versión se responde 304 sin consultar la base de datos.
+    Con solo category=... devuelve la sección completa de esa categoría, también con ETag y en caché.
+    Con cualquiera de los parámetros de paginación, filtro o proyección devuelve una página
+    {"items": [...], "next_cursor": ...}; para la siguiente página se envía cursor=next_cursor.
     ---
     tags:
     - Menu
+    parameters:
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag recibido en una respuesta anterior.
+      - name: category
+        in: query
+        type: string
+        required: false
+        description: Categoría del menú (por ejemplo bebidas o postres).
+      - name: cursor
+        in: query
+        type: integer
+        required: false
+        description: Último ID de la página anterior (next_cursor).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 100
+        description: Tamaño de la página (máximo 500).
+      - name: fields
+        in: query
+        type: string
+        required: false
+        description: Columnas a devolver separadas por coma (por ejemplo id,name,price).
+      - name: available
+        in: query
+        type: boolean
+        required: false
+        description: Filtrar por disponibilidad.
+      - name: min_price
+        in: query
+        type: number
+        required: false
+        description: Precio mínimo (inclusive).
+      - name: max_price
+        in: query
+        type: number
+        required: false
+        description: Precio máximo (inclusive).
     responses:
       200:
-        description: Lista de platillos del menú.
+        description: Lista de platillos del menú, o una página si se usan parámetros.
         schema:
           type: array
           items:
@@ -38,12 +148,100 @@ def route_get_all_menu_items():
               created_at:
                 type: string
                 format: date-time
+      304:
+        description: El menú no ha cambiado desde el ETag enviado.
+      400:
+        description: Parámetros no válidos.
       500:
         description: Error interno.
     """
+    if any(name in request.args for name in LISTING_ARGS):
+        try:
+            options = _parse_listing_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            return jsonify(list_menu_items(**options)), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
     try:
-        items = get_all_menu_items()
-        return jsonify(items), 200
+        if request.args.get("category"):
+            body, etag = get_menu_section_json(normalize_category(request.args["category"]))
+        else:
+            body, etag = get_all_menu_items_json()
+        if etag in request.if_none_match:
+            return _not_modified(etag)
+        response = current_app.response_class(body, status=200, mimetype="application/json")
+        response.set_etag(etag)
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@menu_bp.route('/search', methods=['GET'])
+def route_search_menu_items():
+    """
+    Buscar platillos por texto libre, tolerando errores de escritura.
+    Pensado para resolver lo que escribe el cliente en el chat (por ejemplo "2 tacos al pastr").
+    ---
+    tags:
+    - Menu
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Texto a buscar.
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: Número máximo de resultados (1 a 50).
+      - name: available
+        in: query
+        type: boolean
+        required: false
+        description: Si es true, solo devuelve platillos disponibles.
+    responses:
+      200:
+        description: Platillos ordenados por relevancia.
+        schema:
+          type: array
+          items:
+            type: object
+            properties:
+              id:
+                type: integer
+              name:
+                type: string
+              description:
+                type: string
+              price:
+                type: number
+              available:
+                type: boolean
+              score:
+                type: number
+      400:
+        description: Falta el texto a buscar, o el límite o 'available' no son válidos.
+      500:
+        description: Error interno.
+    """
+    query = request.args.get("q", "").strip()
+    limit = request.args.get("limit", 10, type=int)
+    if not query:
+        return jsonify({"error": "Falta el parámetro 'q'"}), 400
+    if limit is None or not 1 <= limit <= 50:
+        return jsonify({"error": "El parámetro 'limit' debe estar entre 1 y 50"}), 400
+    try:
+        available_only = parse_bool(request.args.get("available", "false"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        results = search_menu_items(query, limit=limit, available_only=available_only)
+        return jsonify(results), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -60,6 +258,11 @@ def route_get_menu_item(item_id):
         type: integer
         required: true
         description: ID del platillo.
+      - name: If-None-Match
+        in: header
+        type: string
+        required: false
+        description: ETag recibido en una respuesta anterior.
     responses:
       200:
         description: Detalles del platillo.
@@ -79,15 +282,22 @@ def route_get_menu_item(item_id):
             created_at:
               type: string
               format: date-time
+      304:
+        description: El platillo no ha cambiado desde el ETag enviado.
       404:
         description: Platillo no encontrado.
       500:
         description: Error interno.
     """
     try:
+        etag = f"{get_menu_etag()}-{item_id}"
+        if etag in request.if_none_match:
+            return _not_modified(etag)
         item = get_menu_item(item_id)
         if item:
-            return jsonify(item), 200
+            response = jsonify(item)
+            response.set_etag(etag)
+            return response, 200
         return jsonify({"message": "Item no encontrado"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -118,16 +328,115 @@ def route_add_menu_item():
               type: number
             available:
               type: boolean
+            category:
+              type: string
+              example: bebidas
     responses:
       201:
         description: Platillo agregado correctamente.
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            item_id:
+              type: integer
+      400:
+        description: Datos no válidos.
       500:
         description: Error al agregar el platillo.
     """
     data = request.get_json()
     try:
-        add_menu_item(data)
-        return jsonify({"message": "Platillo agregado correctamente"}), 201
+        item_id = add_menu_item(data)
+        return jsonify({"message": "Platillo agregado correctamente", "item_id": item_id}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@menu_bp.route('/bulk', methods=['POST'])
+def route_bulk_add_menu_items():
+    """
+    Cargar muchos platillos en una sola petición.
+    Acepta un arreglo JSON (application/json), NDJSON (application/x-ndjson, un platillo por línea)
+    o CSV con encabezados name,description,price,available,category (text/csv).
+    Todas las filas se validan antes de insertar; si alguna falla no se inserta ninguna.
+    ---
+    tags:
+    - Menu
+    consumes:
+      - application/json
+      - application/x-ndjson
+      - text/csv
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - name
+              - price
+            properties:
+              name:
+                type: string
+              description:
+                type: string
+              price:
+                type: number
+              available:
+                type: boolean
+              category:
+                type: string
+    responses:
+      201:
+        description: Platillos agregados; incluye el resultado de cada fila.
+        schema:
+          type: object
+          properties:
+            created:
+              type: integer
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  row:
+                    type: integer
+                  status:
+                    type: string
+                  errors:
+                    type: array
+                    items:
+                      type: string
+      400:
+        description: Cuerpo no válido o filas con errores (no se insertó ninguna).
+      413:
+        description: Demasiadas filas.
+      500:
+        description: Error al agregar los platillos.
+    """
+    mimetype = request.mimetype
+    if mimetype in ("application/x-ndjson", "application/jsonl"):
+        rows = iter_ndjson(request.stream)
+    elif mimetype == "text/csv":
+        rows = iter_csv(request.stream)
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({"error": "Se esperaba un arreglo JSON de platillos"}), 400
+    rows = list(islice(rows, MENU_BULK_MAX_ROWS + 1))
+    if len(rows) > MENU_BULK_MAX_ROWS:
+        return jsonify({"error": f"La carga no puede tener más de {MENU_BULK_MAX_ROWS} platillos"}), 413
+    if not rows:
+        return jsonify({"error": "No se recibió ningún platillo"}), 400
+    try:
+        created, results = bulk_add_menu_items(rows)
+        if not created:
+            return jsonify({"error": "Hay filas con errores; no se agregó ningún platillo", "results": results}), 400
+        return jsonify({"message": "Platillos agregados correctamente", "created": created, "results": results}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -157,9 +466,14 @@ def route_update_menu_item(item_id):
               type: number
             available:
               type: boolean
+            category:
+              type: string
+              example: postres
     responses:
       200:
         description: Platillo actualizado correctamente.
+      400:
+        description: Datos no válidos.
       500:
         description: Error al actualizar el platillo.
     """
@@ -167,6 +481,8 @@ def route_update_menu_item(item_id):
     try:
         update_menu_item(item_id, data)
         return jsonify({"message": "Platillo actualizado correctamente"}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -194,3 +510,162 @@ def route_delete_menu_item(item_id):
         return jsonify({"message": "Platillo eliminado correctamente"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@menu_bp.route('/cache/stats', methods=['GET'])
+def route_get_menu_cache_stats():
+    """
+    Obtener los contadores de la caché del menú.
+    ---
+    tags:
+    - Menu
+    responses:
+      200:
+        description: Contadores de la caché del menú en este proceso.
+        schema:
+          type: object
+          properties:
+            hits:
+              type: integer
+            misses:
+              type: integer
+            invalidations:
+              type: integer
+            hit_ratio:
+              type: number
+            cached:
+              type: boolean
+            items:
+              type: integer
+            ttl_seconds:
+              type: integer
+    """
+    return jsonify(get_menu_cache_stats()), 200
+
+@menu_bp.route('/availability', methods=['PATCH'])
+def route_set_menu_items_availability():
+    """
+    Cambiar la disponibilidad de uno o varios platillos ("86" cuando se acaban en cocina).
+    Solo modifica el campo available y avisa a los clientes suscritos a /menu/events.
+    ---
+    tags:
+    - Menu
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - ids
+            - available
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+              example: [3, 7]
+            available:
+              type: boolean
+              example: false
+    responses:
+      200:
+        description: Disponibilidad actualizada.
+        schema:
+          type: object
+          properties:
+            updated:
+              type: array
+              items:
+                type: integer
+            not_found:
+              type: array
+              items:
+                type: integer
+      400:
+        description: Datos no válidos.
+      500:
+        description: Error al actualizar la disponibilidad.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": "'ids' debe ser una lista de IDs de platillos"}), 400
+    try:
+        available = parse_bool(data.get("available"))
+    except ValueError:
+        return jsonify({"error": "'available' debe ser verdadero o falso"}), 400
+    try:
+        result = set_menu_items_availability(list(dict.fromkeys(ids)), available)
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@menu_bp.route('/events', methods=['GET'])
+def route_menu_events():
+    """
+    Suscribirse a los cambios del menú por Server-Sent Events.
+    Eventos: 'availability' ({"ids": [...], "available": bool}) y 'menu_changed' ({"action": ...}).
+    Al reconectar, el cliente envía Last-Event-ID para recibir los eventos que se perdió; si ya no
+    se pueden recuperar (el ID es de otro worker, de antes de un reinicio o salió del historial) recibe
+    un evento 'reset' y debe volver a cargar el menú con GET /menu/.
+    Solo llegan los cambios hechos en el mismo proceso: este flujo se debe servir con un solo worker.
+    ---
+    tags:
+    - Menu
+    produces:
+      - text/event-stream
+    parameters:
+      - name: Last-Event-ID
+        in: header
+        type: string
+        required: false
+        description: ID del último evento recibido.
+    responses:
+      200:
+        description: Flujo de eventos del menú.
+    """
+    last_event_id = parse_last_event_id(request.headers.get("Last-Event-ID"))
+    return Response(
+        menu_events.stream(last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@menu_bp.route('/snapshots/<int:version>', methods=['GET'])
+def route_get_menu_snapshot(version):
+    """
+    Obtener una versión inmutable del menú (la que se guarda en orders.menu_version).
+    Como las versiones no cambian, la respuesta se puede guardar en caché indefinidamente.
+    ---
+    tags:
+    - Menu
+    parameters:
+      - name: version
+        in: path
+        type: integer
+        required: true
+        description: ID de la versión del menú.
+    responses:
+      200:
+        description: Menú completo tal como estaba en esa versión.
+      304:
+        description: El cliente ya tiene esta versión.
+      404:
+        description: Versión no encontrada.
+      500:
+        description: Error interno.
+    """
+    etag = f"snapshot-{version}"
+    if etag in request.if_none_match:
+        return _not_modified(etag)
+    try:
+        snapshot = get_menu_snapshot(version)
+        if snapshot is None:
+            return jsonify({"error": "Versión del menú no encontrada"}), 404
+        response = current_app.response_class(snapshot["body"], status=200, mimetype="application/json")
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,7 +1,9 @@
 # routes/order_item_routes.py
 from flask import Blueprint, request, jsonify
+from config import ORDER_ITEM_BULK_MAX_ROWS
 from handlers.order_item_handler import (
     create_order_item,
+    create_order_items,
     get_order_item,
     get_order_items_by_order,
     update_order_item,
@@ -65,6 +67,94 @@ def route_create_order_item():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@order_item_bp.route('/bulk', methods=['POST'])
+def route_create_order_items():
+    """
+    Agregar muchos ítems a una o varias órdenes en una sola petición (por ejemplo una ronda de bebidas).
+    El precio de cada ítem se toma del menú. Todas las filas se validan antes de insertar;
+    si alguna falla no se inserta ninguna. El total de cada orden se actualiza una sola vez.
+    ---
+    tags:
+    - Order_Items
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - order_id
+              - menu_item_id
+            properties:
+              order_id:
+                type: integer
+                example: 1
+              menu_item_id:
+                type: integer
+                example: 2
+              quantity:
+                type: integer
+                example: 3
+    responses:
+      201:
+        description: Ítems agregados; incluye el resultado de cada fila y el monto sumado a cada orden.
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            created:
+              type: integer
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  row:
+                    type: integer
+                  status:
+                    type: string
+                  errors:
+                    type: array
+                    items:
+                      type: string
+            orders:
+              type: array
+              items:
+                type: object
+                properties:
+                  order_id:
+                    type: integer
+                  items:
+                    type: integer
+                  amount:
+                    type: number
+      400:
+        description: Cuerpo no válido o filas con errores (no se insertó ninguna).
+      413:
+        description: Demasiadas filas.
+      500:
+        description: Error interno.
+    """
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "Se esperaba un arreglo JSON de ítems"}), 400
+    if len(rows) > ORDER_ITEM_BULK_MAX_ROWS:
+        return jsonify({"error": f"La carga no puede tener más de {ORDER_ITEM_BULK_MAX_ROWS} ítems"}), 413
+    try:
+        created, results, orders = create_order_items(rows)
+        if not created:
+            return jsonify({"error": "Hay filas con errores; no se agregó ningún ítem", "results": results}), 400
+        return jsonify({
+            "message": "Ítems de la orden creados con éxito",
+            "created": created,
+            "results": results,
+            "orders": orders
+        }), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @order_item_bp.route('/<int:order_item_id>', methods=['GET'])
 def route_get_order_item(order_item_id):
     """
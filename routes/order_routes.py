@@ -1,23 +1,183 @@
 # routes/order_routes.py
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from config import (
+    ORDER_PAGE_SIZE,
+    ORDER_MAX_PAGE_SIZE,
+    ORDER_BATCH_MAX_IDS,
+    ORDER_BATCH_CREATE_MAX_ORDERS,
+    ORDER_BATCH_DELETE_MAX_IDS,
+    ORDER_STATUS_BULK_MAX_IDS,
+    KITCHEN_TOP_MAX_SIZE
+)
+from models.order_status import STATUSES, TRANSITIONS
+from utils.event_stream import parse_last_event_id
+from utils.idempotency import idempotency_store, idempotent
 from handlers.order_handler import (
     create_order,
-    get_orders,
+    create_orders,
+    order_events,
+    get_kitchen_tickets,
+    iter_orders,
+    iter_orders_with_items,
+    decode_order_cursor,
     update_order_status,
+    bulk_update_order_status,
+    OrderVersionConflict,
     get_order_details,
-    delete_order
+    get_orders_details,
+    delete_order,
+    delete_orders
 )
 
 order_bp = Blueprint('order_routes', __name__)
 
+def _parse_int_arg(args, name):
+    value = args.get(name)
+    if value is None or value == "":
+        return None
+    if not value.isdigit():
+        raise ValueError(f"El parámetro '{name}' debe ser un número entero")
+    return int(value)
+
+def _parse_datetime_arg(args, name, end_of_day=False):
+    """
+    Acepta fechas (YYYY-MM-DD) o fechas con hora en formato ISO.
+    Con end_of_day=True una fecha sin hora incluye todo ese día.
+    """
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            parsed = datetime(day.year, day.month, day.day)
+            return parsed + timedelta(days=1) if end_of_day else parsed
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"El parámetro '{name}' debe ser una fecha ISO (YYYY-MM-DD)")
+
+def _parse_order_filters(args):
+    """
+    Lee los filtros de órdenes de la query string. Lanza ValueError si alguno no es válido.
+    """
+    return {
+        "status": args.get("status") or None,
+        "user_id": _parse_int_arg(args, "user_id"),
+        "employee_id": _parse_int_arg(args, "employee_id"),
+        "date_from": _parse_datetime_arg(args, "date_from"),
+        "date_to": _parse_datetime_arg(args, "date_to", end_of_day=True)
+    }
+
+def _stream_order_list(orders, chunk_size=100):
+    """
+    Genera un arreglo JSON con las órdenes, enviándolo por partes.
+    """
+    buffer = ["["]
+    for count, (order, _) in enumerate(orders):
+        buffer.append(("," if count else "") + json.dumps(order))
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append("]")
+    yield "".join(buffer)
+
+def _stream_order_page(orders, limit, chunk_size=100):
+    """
+    Genera {"items": [...], "next_cursor": ...}. 'orders' debe traer hasta limit + 1 órdenes;
+    la orden extra solo indica que existe una página siguiente.
+    """
+    buffer = ['{"items":[']
+    last_cursor = None
+    has_more = False
+    count = 0
+    for order, cursor in orders:
+        if count == limit:
+            has_more = True
+            break
+        buffer.append(("," if count else "") + json.dumps(order))
+        last_cursor = cursor
+        count += 1
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer)
+            buffer = []
+    buffer.append('],"next_cursor":' + json.dumps(last_cursor if has_more else None) + "}")
+    yield "".join(buffer)
+
+EXPORT_CSV_COLUMNS = (
+    "order_id", "user_id", "employee_id", "status", "total", "menu_version", "created_at",
+    "menu_item_id", "quantity", "subtotal"
+)
+
+def _stream_export_ndjson(orders, chunk_size=100):
+    """
+    Genera una línea JSON por orden (con sus ítems), enviándolas por partes.
+    Si la lectura falla a mitad de la exportación (la respuesta 200 ya se envió), la última
+    línea es {"error": ...} para que el cliente sepa que el archivo está incompleto.
+    """
+    buffer = []
+    try:
+        for order in orders:
+            buffer.append(json.dumps(order) + "\n")
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer = []
+    except Exception as e:
+        current_app.logger.exception("Error exportando órdenes")
+        buffer.append(json.dumps({"error": f"Exportación incompleta: {str(e)}"}) + "\n")
+    if buffer:
+        yield "".join(buffer)
+
+def _stream_export_csv(orders, chunk_size=500):
+    """
+    Genera un CSV con una fila por ítem; los datos de la orden se repiten en cada fila.
+    Una orden sin ítems ocupa una fila con las columnas del ítem vacías.
+    Si la lectura falla a mitad de la exportación, la última fila es "ERROR,<mensaje>".
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    rows = 0
+    try:
+        for order in orders:
+            head = [
+                order["id"], order["user_id"], order["employee_id"], order["status"],
+                order["total"], order["menu_version"], order["created_at"]
+            ]
+            for item in order["items"] or [None]:
+                if item is None:
+                    writer.writerow(head + ["", "", ""])
+                else:
+                    writer.writerow(head + [item["menu_item_id"], item["quantity"], item["subtotal"]])
+                rows += 1
+            if rows >= chunk_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                rows = 0
+    except Exception as e:
+        current_app.logger.exception("Error exportando órdenes")
+        writer.writerow(["ERROR", f"Exportación incompleta: {str(e)}"])
+    yield buffer.getvalue()
+
 @order_bp.route('/create', methods=['POST'])
+@idempotent(idempotency_store, "order_create")
 def route_create_order():
     """
     Crear una orden.
+    El precio de cada ítem se toma del menú; los platillos inexistentes o no disponibles se rechazan.
     ---
     tags:
       - Orders
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Clave única del cliente; los reintentos con la misma clave reciben la respuesta original sin crear la orden de nuevo.
       - in: body
         name: body
         schema:
@@ -38,8 +198,6 @@ def route_create_order():
                 type: object
                 required:
                   - menu_item_id
-                  - quantity
-                  - price
                 properties:
                   menu_item_id:
                     type: integer
@@ -47,45 +205,487 @@ def route_create_order():
                   quantity:
                     type: integer
                     example: 2
-                  price:
-                    type: number
-                    example: 150.00
     responses:
       201:
         description: Orden creada con éxito.
+      400:
+        description: Datos no válidos o platillos inexistentes o no disponibles.
+      409:
+        description: La petición original con el mismo Idempotency-Key sigue en proceso.
+      422:
+        description: El Idempotency-Key ya se usó con otros datos.
       500:
         description: Error interno.
     """
     data = request.get_json()
     try:
-        order_id = create_order(data)
+        order_id = create_order(data or {})
         return jsonify({"message": "Orden creada con éxito", "order_id": order_id}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/batch_create', methods=['POST'])
+@idempotent(idempotency_store, "order_batch_create")
+def route_create_orders():
+    """
+    Crear varias órdenes en una sola petición (eventos, banquetes o mesas grandes).
+    Todas las órdenes se validan y se guardan en una sola transacción: si alguna tiene errores
+    no se crea ninguna y la respuesta indica los errores de cada una.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Clave única del cliente; los reintentos con la misma clave reciben la respuesta original sin crear las órdenes de nuevo.
+      - in: body
+        name: body
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - user_id
+              - items
+            properties:
+              user_id:
+                type: integer
+                example: 1
+              employee_id:
+                type: integer
+                example: 2
+              items:
+                type: array
+                items:
+                  type: object
+                  properties:
+                    menu_item_id:
+                      type: integer
+                      example: 3
+                    quantity:
+                      type: integer
+                      example: 2
+    responses:
+      201:
+        description: Órdenes creadas; cada resultado trae su order_id.
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            created:
+              type: integer
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  row:
+                    type: integer
+                  status:
+                    type: string
+                  order_id:
+                    type: integer
+                  errors:
+                    type: array
+                    items:
+                      type: string
+      400:
+        description: Cuerpo no válido u órdenes con errores (no se creó ninguna).
+      413:
+        description: Demasiadas órdenes.
+      500:
+        description: Error interno.
+    """
+    orders = request.get_json(silent=True)
+    if not isinstance(orders, list) or not orders:
+        return jsonify({"error": "Se esperaba un arreglo JSON de órdenes"}), 400
+    if len(orders) > ORDER_BATCH_CREATE_MAX_ORDERS:
+        return jsonify({"error": f"No se pueden crear más de {ORDER_BATCH_CREATE_MAX_ORDERS} órdenes a la vez"}), 413
+    try:
+        created, results = create_orders(orders)
+        if not created:
+            return jsonify({"error": "Hay órdenes con errores; no se creó ninguna", "results": results}), 400
+        return jsonify({"message": "Órdenes creadas con éxito", "created": created, "results": results}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @order_bp.route('/', methods=['GET'])
 def route_get_orders():
     """
-    Obtener todas las órdenes.
+    Obtener las órdenes, ordenadas por fecha de creación.
+    Los filtros se aplican en la base de datos y la respuesta se envía por partes (streaming),
+    así la memoria no crece con el tamaño de la tabla.
+    Sin limit ni cursor devuelve un arreglo con todas las órdenes que cumplen los filtros.
+    Con limit o cursor devuelve una página {"items": [...], "next_cursor": ...};
+    para la siguiente página se envía cursor=next_cursor.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - name: status
+        in: query
+        type: string
+        required: false
+      - name: user_id
+        in: query
+        type: integer
+        required: false
+      - name: employee_id
+        in: query
+        type: integer
+        required: false
+      - name: date_from
+        in: query
+        type: string
+        required: false
+        description: Fecha inicial (YYYY-MM-DD o ISO con hora), inclusiva.
+      - name: date_to
+        in: query
+        type: string
+        required: false
+        description: Fecha final (YYYY-MM-DD incluye todo el día).
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: Tamaño de la página (máximo 1000).
+      - name: cursor
+        in: query
+        type: string
+        required: false
+        description: Valor next_cursor de la página anterior.
+    responses:
+      200:
+        description: Lista de órdenes o una página de órdenes.
+      400:
+        description: Parámetros no válidos.
+      500:
+        description: Error interno.
+    """
+    try:
+        filters = _parse_order_filters(request.args)
+        after = decode_order_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = _parse_int_arg(request.args, "limit")
+        if limit is not None and not 1 <= limit <= ORDER_MAX_PAGE_SIZE:
+            raise ValueError(f"El parámetro 'limit' debe estar entre 1 y {ORDER_MAX_PAGE_SIZE}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if limit is None and after is None:
+            orders = iter_orders(filters)
+            body = _stream_order_list(orders)
+        else:
+            limit = limit or ORDER_PAGE_SIZE
+            orders = iter_orders(filters, after=after, limit=limit + 1)
+            body = _stream_order_page(orders, limit)
+        return Response(stream_with_context(body), mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/export', methods=['GET'])
+def route_export_orders():
+    """
+    Exportar las órdenes con sus ítems en NDJSON o CSV.
+    La exportación se envía por partes (streaming) y se lee de la base de datos por lotes,
+    así un rango de varios meses no carga todo en memoria.
     ---
     tags:
       - Orders
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, csv]
+        default: ndjson
+        required: false
+      - name: status
+        in: query
+        type: string
+        required: false
+      - name: user_id
+        in: query
+        type: integer
+        required: false
+      - name: employee_id
+        in: query
+        type: integer
+        required: false
+      - name: date_from
+        in: query
+        type: string
+        required: false
+        description: Fecha inicial (YYYY-MM-DD o ISO con hora), inclusiva.
+      - name: date_to
+        in: query
+        type: string
+        required: false
+        description: Fecha final (YYYY-MM-DD incluye todo el día).
     responses:
       200:
-        description: Lista de órdenes.
+        description: >
+          NDJSON con una orden por línea, o CSV con una fila por ítem. Si la exportación falla
+          después de empezar, termina con una línea {"error": ...} (NDJSON) o una fila ERROR (CSV).
+      400:
+        description: Parámetros no válidos.
       500:
         description: Error interno.
     """
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "El parámetro 'format' debe ser 'ndjson' o 'csv'"}), 400
+    try:
+        filters = _parse_order_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        orders = get_orders()
-        return jsonify(orders), 200
+        orders = iter_orders_with_items(filters)
+        if export_format == "csv":
+            body, mimetype = _stream_export_csv(orders), "text/csv"
+        else:
+            body, mimetype = _stream_export_ndjson(orders), "application/x-ndjson"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=orders.{export_format}"}
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@order_bp.route('/events', methods=['GET'])
+def route_order_events():
+    """
+    Suscribirse a los cambios de estado de las órdenes por Server-Sent Events.
+    Cada evento 'status_changed' trae {"order_id", "previous_status", "status", "user_id", "employee_id"};
+    al crear una orden previous_status es null. Reemplaza consultar GET /order/ cada pocos segundos.
+    Al reconectar, el cliente envía Last-Event-ID para recibir los eventos que se perdió; si ya no
+    se pueden recuperar (el ID es de otro worker, de antes de un reinicio o salió del historial) recibe
+    un evento 'reset' y debe volver a cargar las órdenes con GET /order/.
+    Solo llegan los cambios hechos en el mismo proceso: este flujo se debe servir con un solo worker.
+    ---
+    tags:
+      - Orders
+    produces:
+      - text/event-stream
+    parameters:
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Solo eventos cuyo nuevo estado esté en la lista (separada por coma).
+        example: pendiente,en_preparacion
+      - name: employee_id
+        in: query
+        type: integer
+        required: false
+        description: Solo eventos de las órdenes de este empleado.
+      - name: Last-Event-ID
+        in: header
+        type: string
+        required: false
+        description: ID del último evento recibido.
+    responses:
+      200:
+        description: Flujo de eventos de las órdenes.
+      400:
+        description: Parámetros no válidos.
+    """
+    try:
+        employee_id = _parse_int_arg(request.args, "employee_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    statuses = {value.strip() for value in request.args.get("status", "").split(",") if value.strip()}
+
+    def predicate(event_type, data):
+        if statuses and data["status"] not in statuses:
+            return False
+        if employee_id is not None and data["employee_id"] != employee_id:
+            return False
+        return True
+
+    last_event_id = parse_last_event_id(request.headers.get("Last-Event-ID"))
+    return Response(
+        order_events.stream(last_event_id, predicate=predicate),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@order_bp.route('/kitchen/next', methods=['GET'])
+def route_kitchen_next():
+    """
+    Obtener el siguiente ticket de cocina (la orden activa más urgente).
+    La urgencia combina la antigüedad de la orden y su tiempo estimado de preparación:
+    sale primero la que hay que empezar antes (start_by) para tenerla lista a tiempo.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Solo tickets con este estado (por ejemplo pendiente).
+    responses:
+      200:
+        description: Ticket más urgente, o null si no hay órdenes activas.
+        schema:
+          type: object
+          properties:
+            ticket:
+              type: object
+      500:
+        description: Error interno.
+    """
+    try:
+        tickets = get_kitchen_tickets(1, request.args.get("status") or None)
+        return jsonify({"ticket": tickets[0] if tickets else None}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/kitchen/top', methods=['GET'])
+def route_kitchen_top():
+    """
+    Obtener los tickets de cocina más urgentes, en orden de atención.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+        description: Número de tickets (máximo 100).
+      - name: status
+        in: query
+        type: string
+        required: false
+        description: Solo tickets con este estado.
+    responses:
+      200:
+        description: Lista de tickets con order_id, status, units, prep_seconds, created_at, start_by y ready_by.
+      400:
+        description: Parámetros no válidos.
+      500:
+        description: Error interno.
+    """
+    try:
+        limit = _parse_int_arg(request.args, "limit")
+        if limit is None:
+            limit = 10
+        if not 1 <= limit <= KITCHEN_TOP_MAX_SIZE:
+            raise ValueError(f"El parámetro 'limit' debe estar entre 1 y {KITCHEN_TOP_MAX_SIZE}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(get_kitchen_tickets(limit, request.args.get("status") or None)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/status/bulk', methods=['PATCH'])
+def route_bulk_update_order_status():
+    """
+    Cambiar el estado de muchas órdenes a la vez (por ejemplo marcar como listas todas las de una tanda).
+    Se hace con un solo UPDATE que solo toma las órdenes cuyo estado actual permite el cambio;
+    la respuesta indica cuáles se actualizaron y cuáles no.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          required:
+            - ids
+            - status
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+              example: [10, 11, 12]
+            status:
+              type: string
+              enum: [pendiente, en_preparacion, lista, completada, cancelada]
+              example: lista
+    responses:
+      200:
+        description: Resultado por orden.
+        schema:
+          type: object
+          properties:
+            updated:
+              type: array
+              items:
+                type: integer
+            unchanged:
+              type: array
+              items:
+                type: integer
+            rejected:
+              type: array
+              items:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                  status:
+                    type: string
+            not_found:
+              type: array
+              items:
+                type: integer
+      400:
+        description: Datos no válidos.
+      413:
+        description: Demasiados IDs.
+      500:
+        description: Error interno.
+    """
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({"error": "'ids' debe ser una lista de IDs de órdenes"}), 400
+    if len(ids) > ORDER_STATUS_BULK_MAX_IDS:
+        return jsonify({"error": f"No se pueden actualizar más de {ORDER_STATUS_BULK_MAX_IDS} órdenes a la vez"}), 413
+    try:
+        result = bulk_update_order_status(list(dict.fromkeys(ids)), data.get("status"))
+        return jsonify(result), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/status/transitions', methods=['GET'])
+def route_order_status_transitions():
+    """
+    Obtener los estados de una orden y los cambios de estado permitidos.
+    ---
+    tags:
+      - Orders
+    responses:
+      200:
+        description: Estados válidos y, para cada estado, a cuáles puede pasar.
+    """
+    return jsonify({
+        "statuses": list(STATUSES),
+        "transitions": {status: list(targets) for status, targets in TRANSITIONS.items()}
+    }), 200
+
 @order_bp.route('/<int:order_id>', methods=['PUT'])
 def route_update_order_status(order_id):
     """
     Actualizar el estado de una orden.
+    Solo se permiten los cambios definidos en GET /order/status/transitions (400 en otro caso).
+    Si se envía 'version' (la que devolvió la última lectura de la orden) el cambio solo se aplica
+    si nadie más modificó la orden desde entonces; si otra persona la cambió se responde 409
+    con la versión actual, para que el cliente vuelva a leer la orden y decida.
+    Sin 'version' gana el último cambio de estado válido (last-writer-wins).
     ---
     tags:
       - Orders
@@ -102,21 +702,83 @@ def route_update_order_status(order_id):
           properties:
             status:
               type: string
+              enum: [pendiente, en_preparacion, lista, completada, cancelada]
               example: completada
+            version:
+              type: integer
+              example: 3
     responses:
       200:
-        description: Estado de la orden actualizado correctamente.
+        description: Estado de la orden actualizado correctamente (incluye la nueva versión).
+      400:
+        description: Estado no válido o cambio de estado no permitido.
+      409:
+        description: La orden fue modificada por otra persona; se devuelve current_version.
       500:
         description: Error interno.
     """
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    version = data.get("version")
+    if version is not None and (not isinstance(version, int) or isinstance(version, bool) or version < 0):
+        return jsonify({"error": "'version' debe ser un entero mayor o igual a 0"}), 400
     try:
-        updated_order = update_order_status(order_id, data.get("status"))
+        updated_order = update_order_status(order_id, data.get("status"), expected_version=version)
         return jsonify({
             "message": "Estado de la orden actualizado",
-            "order_id": updated_order.id,
-            "new_status": updated_order.status
+            "order_id": updated_order["order_id"],
+            "new_status": updated_order["status"],
+            "version": updated_order["version"]
         }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except OrderVersionConflict as e:
+        return jsonify({"error": str(e), "current_version": e.current_version}), 409
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/batch', methods=['GET'])
+def route_get_orders_details():
+    """
+    Obtener los detalles de varias órdenes (con sus ítems) en una sola petición.
+    Pensado para la pantalla de cocina: evita pedir cada orden por separado.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - name: ids
+        in: query
+        type: string
+        required: true
+        description: IDs de las órdenes separados por coma (máximo 200).
+        example: 10,11,12
+    responses:
+      200:
+        description: Órdenes encontradas e IDs no encontrados.
+        schema:
+          type: object
+          properties:
+            orders:
+              type: array
+              items:
+                type: object
+            not_found:
+              type: array
+              items:
+                type: integer
+      400:
+        description: Lista de IDs no válida.
+      500:
+        description: Error interno.
+    """
+    raw_ids = [value.strip() for value in request.args.get("ids", "").split(",") if value.strip()]
+    if not raw_ids or not all(value.isdigit() for value in raw_ids):
+        return jsonify({"error": "El parámetro 'ids' debe ser una lista de IDs separados por coma"}), 400
+    order_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    if len(order_ids) > ORDER_BATCH_MAX_IDS:
+        return jsonify({"error": f"No se pueden pedir más de {ORDER_BATCH_MAX_IDS} órdenes a la vez"}), 400
+    try:
+        orders, not_found = get_orders_details(order_ids)
+        return jsonify({"orders": orders, "not_found": not_found}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -173,3 +835,67 @@ def route_delete_order(order_id):
         return jsonify({"message": "Orden eliminada con éxito"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@order_bp.route('/batch_delete', methods=['POST'])
+def route_delete_orders():
+    """
+    Eliminar muchas órdenes (con sus ítems y pagos) en una sola petición.
+    Se indican los IDs o un filtro por estado cerrado (completada o cancelada) y, opcionalmente,
+    antigüedad; el filtro nunca borra órdenes abiertas. El borrado se hace por lotes
+    con un DELETE por tabla en cada lote.
+    ---
+    tags:
+      - Orders
+    parameters:
+      - in: body
+        name: body
+        schema:
+          type: object
+          properties:
+            ids:
+              type: array
+              items:
+                type: integer
+              example: [10, 11, 12]
+            status:
+              type: string
+              enum: [completada, cancelada]
+              example: cancelada
+            older_than_days:
+              type: integer
+              example: 30
+    responses:
+      200:
+        description: Órdenes eliminadas, lotes procesados e IDs no encontrados.
+      400:
+        description: Datos no válidos, sin criterio de borrado o filtro sin un estado cerrado.
+      413:
+        description: Demasiados IDs.
+      500:
+        description: Error interno.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Se esperaba un objeto JSON con 'ids' o un filtro"}), 400
+    order_ids = data.get("ids")
+    older_than_days = data.get("older_than_days")
+    status = data.get("status")
+    if order_ids is not None:
+        if not isinstance(order_ids, list) or not all(isinstance(order_id, int) and not isinstance(order_id, bool) for order_id in order_ids):
+            return jsonify({"error": "'ids' debe ser una lista de enteros"}), 400
+        if status is not None or older_than_days is not None:
+            return jsonify({"error": "Se deben indicar 'ids' o un filtro, no ambos"}), 400
+        if len(order_ids) > ORDER_BATCH_DELETE_MAX_IDS:
+            return jsonify({"error": f"No se pueden eliminar más de {ORDER_BATCH_DELETE_MAX_IDS} órdenes por ID a la vez"}), 413
+        order_ids = list(dict.fromkeys(order_ids))
+    if older_than_days is not None and (not isinstance(older_than_days, int) or isinstance(older_than_days, bool) or older_than_days < 0):
+        return jsonify({"error": "'older_than_days' debe ser un entero mayor o igual a 0"}), 400
+    if status is not None and (not isinstance(status, str) or not status.strip()):
+        return jsonify({"error": "'status' debe ser texto"}), 400
+    try:
+        result = delete_orders(order_ids, status=status, older_than_days=older_than_days)
+        return jsonify(dict(result, message="Órdenes eliminadas con éxito")), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
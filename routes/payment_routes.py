@@ -1,5 +1,6 @@
 # routes/payment_routes.py
 from flask import Blueprint, request, jsonify
+from utils.idempotency import idempotency_store, idempotent
 from handlers.payment_handler import (
     create_payment,
     get_payment,
@@ -11,6 +12,7 @@ from handlers.payment_handler import (
 payment_bp = Blueprint('payment', __name__)
 
 @payment_bp.route('/', methods=['POST'])
+@idempotent(idempotency_store, "payment_create")
 def route_create_payment():
     """
     Crear un nuevo pago.
@@ -18,6 +20,11 @@ def route_create_payment():
     tags:
       - Payments
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Clave única del cliente; los reintentos con la misma clave reciben la respuesta original sin crear el pago de nuevo.
       - in: body
         name: body
         schema:
@@ -46,6 +53,10 @@ def route_create_payment():
               type: string
             payment_id:
               type: integer
+      409:
+        description: La petición original con el mismo Idempotency-Key sigue en proceso.
+      422:
+        description: El Idempotency-Key ya se usó con otros datos.
       500:
         description: Error interno.
     """
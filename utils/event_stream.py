@@ -0,0 +1,94 @@
+# utils/event_stream.py
+import json
+import threading
+import uuid
+from collections import deque
+from config import SSE_HISTORY_SIZE, SSE_KEEPALIVE_SECONDS
+
+class EventBroker:
+    """
+    Canal de eventos en proceso para enviar cambios a los clientes por Server-Sent Events.
+    Cada evento recibe un ID creciente y se guardan los últimos 'history' eventos, de modo
+    que un cliente que se reconecta con Last-Event-ID recibe solo lo que se perdió.
+    Los eventos solo incluyen los cambios hechos en este proceso, así que los flujos SSE deben
+    servirse con un solo worker (por ejemplo gunicorn -w 1 --threads N).
+    Los IDs enviados llevan un identificador del proceso ("<proceso>:<número>"). Si el
+    Last-Event-ID es de otro proceso (otro worker o un reinicio) o ya salió del historial, el
+    cliente recibe primero un evento 'reset' y debe volver a cargar el estado completo.
+    """
+
+    def __init__(self, history=SSE_HISTORY_SIZE):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)
+        self._last_id = 0
+        self.stream_id = uuid.uuid4().hex[:12]
+        self.subscribers = 0
+
+    def publish(self, event_type, data):
+        """
+        Publica un evento y despierta a los suscriptores. Retorna el ID del evento.
+        """
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event_type, data))
+            self._cond.notify_all()
+            return self._last_id
+
+    def _events_after(self, last_id):
+        return last_id, [event for event in self._events if event[0] > last_id]
+
+    def _resume_from(self, last_event_id):
+        """
+        Retorna una tupla (último_id, motivo_reset) para un Last-Event-ID; 'motivo_reset' es None
+        si los eventos posteriores siguen en el historial. Se llama con self._cond tomado.
+        """
+        if last_event_id is None:
+            return self._last_id, None
+        stream_id, _, number = last_event_id.rpartition(":")
+        if stream_id != self.stream_id or not number.isdigit() or int(number) > self._last_id:
+            return self._last_id, "unknown_id"
+        oldest = self._events[0][0] if self._events else self._last_id + 1
+        if int(number) < oldest - 1:
+            return self._last_id, "history_expired"
+        return int(number), None
+
+    def stream(self, last_event_id=None, predicate=None, keepalive=SSE_KEEPALIVE_SECONDS):
+        """
+        Generador de mensajes SSE. Si se indica 'last_event_id' primero envía los eventos
+        posteriores que sigan en el historial; si ya no se pueden recuperar envía un evento
+        'reset' con el motivo. 'predicate(event_type, data)' permite filtrar.
+        Cada 'keepalive' segundos sin eventos envía un comentario para mantener la conexión.
+        """
+        with self._cond:
+            last_id, reset = self._resume_from(last_event_id)
+            self.subscribers += 1
+        try:
+            yield "retry: 3000\n\n"
+            if reset:
+                payload = json.dumps({"reason": reset})
+                yield f"id: {self.stream_id}:{last_id}\nevent: reset\ndata: {payload}\n\n"
+            while True:
+                with self._cond:
+                    last_id, pending = self._events_after(last_id)
+                    if not pending:
+                        self._cond.wait(timeout=keepalive)
+                        last_id, pending = self._events_after(last_id)
+                if not pending:
+                    yield ": keepalive\n\n"
+                    continue
+                for event_id, event_type, data in pending:
+                    last_id = event_id
+                    if predicate is None or predicate(event_type, data):
+                        payload = json.dumps(data, default=str)
+                        yield f"id: {self.stream_id}:{event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+def parse_last_event_id(value):
+    """
+    Limpia el encabezado Last-Event-ID; retorna None si viene vacío.
+    """
+    if value and value.strip():
+        return value.strip()[:64]
+    return None
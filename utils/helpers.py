@@ -1,7 +1,51 @@
 # utils/helpers.py
+import csv
+import io
+import json
 
 def validate_order_input(input_data):
     """Valida si el dato de entrada es válido (en este caso, que haya un 'item')"""
     if input_data and 'item' in input_data:
         return True
     return False
+
+def parse_bool(value):
+    """
+    Convierte a booleano valores como True, 1, "true", "1", "si" o "no".
+    Lanza ValueError si el valor no se reconoce.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        normalized = value.strip().lower()
+        if normalized in ("1", "true", "si", "sí"):
+            return True
+        if normalized in ("0", "false", "no"):
+            return False
+    raise ValueError(f"Valor booleano no válido: '{value}'")
+
+def iter_ndjson(stream):
+    """
+    Lee un flujo NDJSON (un objeto JSON por línea) sin cargarlo completo en memoria.
+    Las líneas vacías se ignoran; las que no son JSON válido se devuelven como texto
+    para que la validación las reporte en su número de fila.
+    """
+    for raw in stream:
+        line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+def iter_csv(stream):
+    """
+    Lee un flujo CSV con encabezados y devuelve un diccionario por fila.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    for row in csv.DictReader(text):
+        yield {key.strip(): value for key, value in row.items() if key}
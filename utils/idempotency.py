@@ -0,0 +1,158 @@
+# utils/idempotency.py
+import hashlib
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import Response, current_app, jsonify, make_response, request
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from config import IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS, IDEMPOTENCY_PURGE_BATCH
+from db_init import db
+from models.idempotency_key_model import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+class IdempotencyStore:
+    """
+    Respuestas por Idempotency-Key guardadas en la tabla idempotency_keys, compartida por todos
+    los workers: un reintento que llega a otro proceso también se reconoce.
+    La clave se inserta en la sesión antes de ejecutar la ruta, sin confirmar, así el handler la
+    confirma en la misma transacción que crea la orden o el pago. Una petición duplicada que llega
+    mientras tanto queda detenida en su INSERT (llave primaria) hasta ese commit y después espera
+    la respuesta guardada. Cada clave recuerda una huella del cuerpo de la petición para detectar
+    que se reutilizó con otros datos, y vence después de 'ttl_seconds'.
+    """
+
+    def __init__(self, ttl_seconds=IDEMPOTENCY_TTL_SECONDS, purge_batch=IDEMPOTENCY_PURGE_BATCH):
+        self.ttl_seconds = ttl_seconds
+        self.purge_batch = purge_batch
+        self.replays = 0
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def claim(self, key, fingerprint, wait_seconds=IDEMPOTENCY_WAIT_SECONDS):
+        """
+        Reserva 'key' para ejecutar la petición. Retorna una tupla (resultado, entrada):
+          - ("owner", None): la clave quedó insertada (sin confirmar) en la sesión; la petición debe
+            ejecutarse y luego llamar a complete().
+          - ("stored", entrada): ya hay una respuesta guardada para repetir.
+          - ("mismatch", None): la clave se usó con otro cuerpo de petición.
+          - ("in_progress", None): la petición original no terminó dentro de 'wait_seconds'.
+        """
+        table = IdempotencyKey.__table__
+        key_hash = self._hash(key)
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            row = db.session.execute(select(table).where(table.c.key_hash == key_hash)).first()
+            now = datetime.now()
+            if row is not None and row.expires_at <= now:
+                db.session.execute(delete(table).where(table.c.key_hash == key_hash, table.c.expires_at <= now))
+                db.session.commit()
+                row = None
+            if row is None:
+                try:
+                    db.session.execute(table.insert().values(
+                        key_hash=key_hash,
+                        fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=self.ttl_seconds)
+                    ))
+                    return "owner", None
+                except IntegrityError:
+                    # Otra petición con la misma clave la insertó primero
+                    db.session.rollback()
+                    continue
+            # Se cierra la transacción para que la siguiente lectura vea los commits de otros workers
+            db.session.rollback()
+            if row.fingerprint != fingerprint:
+                return "mismatch", None
+            if row.status_code is not None:
+                self.replays += 1
+                return "stored", {"status": row.status_code, "body": bytes(row.body), "mimetype": row.mimetype}
+            if time.monotonic() >= deadline:
+                return "in_progress", None
+            time.sleep(POLL_SECONDS)
+
+    def complete(self, key, fingerprint, response=None):
+        """
+        Termina la petición dueña de 'key'. Si 'response' es una tupla (status, body, mimetype)
+        la guarda para repetirla (y borra hasta 'purge_batch' claves vencidas); con None la clave
+        se borra para que un reintento vuelva a ejecutar la petición.
+        """
+        table = IdempotencyKey.__table__
+        key_hash = self._hash(key)
+        try:
+            if response is None:
+                db.session.rollback()
+                db.session.execute(delete(table).where(table.c.key_hash == key_hash, table.c.status_code.is_(None)))
+                db.session.commit()
+                return
+            status, body, mimetype = response
+            values = {"status_code": status, "body": body, "mimetype": mimetype}
+            result = db.session.execute(update(table).where(table.c.key_hash == key_hash).values(**values))
+            if result.rowcount == 0:
+                # El handler hizo rollback antes de confirmar la clave (por ejemplo en un error 4xx)
+                db.session.execute(table.insert().values(
+                    key_hash=key_hash,
+                    fingerprint=fingerprint,
+                    expires_at=datetime.now() + timedelta(seconds=self.ttl_seconds),
+                    **values
+                ))
+            expired = db.session.execute(
+                select(table.c.key_hash)
+                .where(table.c.expires_at <= datetime.now())
+                .order_by(table.c.expires_at)
+                .limit(self.purge_batch)
+            ).scalars().all()
+            if expired:
+                db.session.execute(delete(table).where(table.c.key_hash.in_(expired)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("No se pudo guardar la respuesta del Idempotency-Key")
+
+def idempotent(store, scope):
+    """
+    Decorador para rutas POST que acepta el encabezado Idempotency-Key.
+    Sin el encabezado la ruta se ejecuta normalmente. Con el encabezado, la primera petición
+    se ejecuta y su respuesta (si no es un error 5xx) se guarda; las repetidas con la misma
+    clave y el mismo cuerpo reciben esa respuesta sin ejecutar la ruta, con el encabezado
+    Idempotent-Replayed. 'scope' separa las claves de rutas distintas.
+    La ruta debe confirmar sus cambios con db.session.commit() para que la clave quede
+    guardada en la misma transacción.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            key = key.strip()
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({"error": f"El encabezado {IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"}), 400
+            scoped_key = f"{scope}:{key}"
+            fingerprint = hashlib.blake2b(request.get_data(), digest_size=16).hexdigest()
+            outcome, entry = store.claim(scoped_key, fingerprint)
+            if outcome == "stored":
+                response = Response(entry["body"], status=entry["status"], mimetype=entry["mimetype"])
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if outcome == "mismatch":
+                return jsonify({"error": f"El {IDEMPOTENCY_HEADER} ya se usó con otros datos"}), 422
+            if outcome == "in_progress":
+                return jsonify({"error": "La petición original con este Idempotency-Key sigue en proceso"}), 409
+            stored = None
+            try:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code < 500:
+                    stored = (response.status_code, response.get_data(), response.mimetype)
+                return response
+            finally:
+                store.complete(scoped_key, fingerprint, stored)
+        return wrapper
+    return decorator
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,108 @@
+# utils/kitchen_queue.py
+import heapq
+import itertools
+import threading
+import time
+
+class KitchenQueue:
+    """
+    Cola de prioridad en memoria con los tickets de cocina (uno por orden activa).
+    Es un heap de entradas [prioridad, secuencia, order_id, ticket]; el menor valor de prioridad
+    sale primero y la secuencia desempata (así nunca se comparan los tickets).
+    Quitar o reemplazar un ticket solo lo marca como eliminado (ticket = None) y el heap
+    se compacta cuando la mitad de las entradas están eliminadas.
+    top(k) recorre el heap desde la raíz con un heap auxiliar de candidatos, así obtener
+    los k primeros cuesta O(k log k) sin ordenar toda la cola.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._entries = {}
+        self._removed = 0
+        self._sequence = itertools.count()
+        self.loaded_at = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _discard(self, order_id):
+        entry = self._entries.pop(order_id, None)
+        if entry is None:
+            return False
+        entry[3] = None
+        self._removed += 1
+        # Descarta las entradas eliminadas de la raíz y compacta si hay demasiadas
+        while self._heap and self._heap[0][3] is None:
+            heapq.heappop(self._heap)
+            self._removed -= 1
+        if self._removed > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if entry[3] is not None]
+            heapq.heapify(self._heap)
+            self._removed = 0
+        return True
+
+    def push(self, order_id, priority, ticket):
+        """
+        Agrega (o reemplaza) el ticket de una orden. O(log n).
+        """
+        with self._lock:
+            self._discard(order_id)
+            entry = [priority, next(self._sequence), order_id, ticket]
+            self._entries[order_id] = entry
+            heapq.heappush(self._heap, entry)
+
+    def update(self, order_id, **changes):
+        """
+        Cambia campos del ticket sin cambiar su prioridad. Retorna False si la orden no está en la cola.
+        """
+        with self._lock:
+            entry = self._entries.get(order_id)
+            if entry is None:
+                return False
+            entry[3] = dict(entry[3], **changes)
+            return True
+
+    def remove(self, order_id):
+        """
+        Quita el ticket de una orden. Retorna False si no estaba en la cola.
+        """
+        with self._lock:
+            return self._discard(order_id)
+
+    def replace_all(self, tickets):
+        """
+        Reemplaza toda la cola con 'tickets', una lista de tuplas (order_id, prioridad, ticket). O(n).
+        """
+        with self._lock:
+            entries = {
+                order_id: [priority, next(self._sequence), order_id, ticket]
+                for order_id, priority, ticket in tickets
+            }
+            heap = list(entries.values())
+            heapq.heapify(heap)
+            self._entries = entries
+            self._heap = heap
+            self._removed = 0
+            self.loaded_at = time.monotonic()
+
+    def top(self, k, predicate=None):
+        """
+        Retorna hasta k tickets en orden de prioridad. 'predicate(ticket)' permite filtrar.
+        """
+        result = []
+        with self._lock:
+            heap = self._heap
+            if not heap or k <= 0:
+                return result
+            candidates = [(heap[0][0], heap[0][1], 0)]
+            while candidates and len(result) < k:
+                _, _, index = heapq.heappop(candidates)
+                ticket = heap[index][3]
+                if ticket is not None and (predicate is None or predicate(ticket)):
+                    result.append(dict(ticket))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(candidates, (heap[child][0], heap[child][1], child))
+        return result
@@ -0,0 +1,241 @@
+# utils/menu_cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from config import MENU_CACHE_TTL_SECONDS, MENU_SECTION_CACHE_SIZE, MENU_SNAPSHOT_CACHE_SIZE
+
+def content_etag(body):
+    """
+    ETag del menú serializado; también es el content_hash de su versión en menu_snapshots.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+class MenuCache:
+    """
+    Caché en proceso del catálogo del menú.
+    Guarda la lista completa de platillos y un índice por ID para que las lecturas
+    del menú no lleguen a MySQL mientras el catálogo no cambie.
+    Las escrituras del menú deben llamar a invalidate() después del commit.
+    Además del catálogo guarda su JSON ya serializado y un ETag derivado de ese
+    contenido, de modo que dos workers con el mismo menú generan el mismo ETag.
+    También guarda por separado cada sección del menú (categoría), con su propio JSON y ETag;
+    las secciones son un LRU de hasta 'max_sections' y las vacías no se guardan, así una
+    categoría inventada en la URL no ocupa memoria.
+    El TTL acota cuánto tiempo puede quedar desactualizado un worker cuando la
+    escritura se hizo en otro proceso.
+    """
+
+    def __init__(self, ttl_seconds=MENU_CACHE_TTL_SECONDS, max_sections=MENU_SECTION_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_sections = max_sections
+        self._lock = threading.Lock()
+        self._items = None
+        self._by_id = {}
+        self._body = None
+        self._etag = None
+        self._sections = OrderedDict()
+        self._loaded_at = 0.0
+        self._generation = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _is_fresh(self):
+        if self._items is None:
+            return False
+        if self.ttl_seconds and time.monotonic() - self._loaded_at > self.ttl_seconds:
+            return False
+        return True
+
+    def get_all(self, loader):
+        """
+        Retorna el catálogo completo. Si no está en caché (o expiró) lo carga con 'loader'.
+        """
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._items
+            self.misses += 1
+            generation = self._generation
+        items = loader()
+        with self._lock:
+            # Si hubo una escritura mientras se cargaba, no se guarda un catálogo viejo
+            if generation == self._generation:
+                self._items = items
+                self._by_id = {item["id"]: item for item in items}
+                self._body = None
+                self._loaded_at = time.monotonic()
+        return items
+
+    def get_catalog(self, loader, serialize):
+        """
+        Retorna una tupla (items, body, etag) con el catálogo, su JSON en bytes y su ETag.
+        La serialización se hace una sola vez por cada carga del catálogo.
+        """
+        items = self.get_all(loader)
+        with self._lock:
+            if self._items is items and self._body is not None:
+                return items, self._body, self._etag
+        body = serialize(items)
+        etag = content_etag(body)
+        with self._lock:
+            if self._items is items:
+                # El contenido pudo cambiar por una escritura hecha en otro worker
+                if self._etag is not None and etag != self._etag:
+                    self.version += 1
+                self._body = body
+                self._etag = etag
+        return items, body, etag
+
+    def prime(self, items, body, etag):
+        """
+        Carga la caché con un catálogo ya serializado (por ejemplo leído del archivo local del menú).
+        """
+        with self._lock:
+            self._items = items
+            self._by_id = {item["id"]: item for item in items}
+            self._body = body
+            self._etag = etag
+            self._loaded_at = time.monotonic()
+
+    def get_section(self, key, loader, serialize):
+        """
+        Retorna una tupla (items, body, etag) para una sección del menú, cargándola con 'loader()'
+        si no está en caché o expiró. Cada sección se guarda y expira por separado; las vacías no se guardan.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sections.get(key)
+            if entry and (not self.ttl_seconds or now - entry[3] <= self.ttl_seconds):
+                self._sections.move_to_end(key)
+                self.hits += 1
+                return entry[:3]
+            self.misses += 1
+            generation = self._generation
+        items = loader()
+        body = serialize(items)
+        etag = content_etag(body)
+        with self._lock:
+            if items and generation == self._generation:
+                self._sections[key] = (items, body, etag, time.monotonic())
+                self._sections.move_to_end(key)
+                while len(self._sections) > self.max_sections:
+                    self._sections.popitem(last=False)
+        return items, body, etag
+
+    def get_item(self, item_id, loader):
+        """
+        Retorna un platillo por ID desde el catálogo en caché, cargándolo si es necesario.
+        Retorna None si el platillo no existe.
+        """
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return self._by_id.get(item_id)
+        items = self.get_all(loader)
+        for item in items:
+            if item["id"] == item_id:
+                return item
+        return None
+
+    def invalidate(self):
+        """
+        Descarta el catálogo en caché. Se llama después de cada escritura del menú.
+        """
+        with self._lock:
+            self._items = None
+            self._by_id = {}
+            self._body = None
+            self._etag = None
+            self._sections = OrderedDict()
+            self._generation += 1
+            self.invalidations += 1
+            self.version += 1
+
+    def stats(self):
+        """
+        Retorna los contadores de la caché.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "cached": self._is_fresh(),
+                "items": len(self._items) if self._items is not None else 0,
+                "sections": len(self._sections),
+                "version": self.version,
+                "etag": self._etag,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+class MenuSnapshotCache:
+    """
+    Caché LRU de versiones del menú (menu_snapshots).
+    Como cada versión es inmutable nunca se invalida; solo se descartan las menos usadas
+    cuando se supera 'max_size'.
+    """
+
+    def __init__(self, max_size=MENU_SNAPSHOT_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version):
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(version)
+            self.hits += 1
+            return entry
+
+    def put(self, version, entry):
+        with self._lock:
+            self._entries[version] = entry
+            self._entries.move_to_end(version)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+def write_menu_blob(path, version, etag, body):
+    """
+    Guarda el menú serializado en 'path': una línea JSON con la versión y el ETag, seguida del cuerpo.
+    Se escribe en un archivo temporal y se reemplaza de forma atómica para que un worker
+    que arranca nunca lea un archivo a medias.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    header = json.dumps({"version": version, "etag": etag}).encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".menu-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as blob:
+            blob.write(header + b"\n" + body)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def read_menu_blob(path):
+    """
+    Lee el archivo escrito por write_menu_blob. Retorna (version, etag, body) o None si no existe o no es válido.
+    """
+    try:
+        with open(path, "rb") as blob:
+            header = json.loads(blob.readline())
+            body = blob.read()
+        return header["version"], header["etag"], body
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+menu_cache = MenuCache()
+menu_snapshots = MenuSnapshotCache()
@@ -0,0 +1,249 @@
+# utils/menu_search.py
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+def normalize_text(value):
+    """
+    Pasa el texto a minúsculas, sin acentos y con solo letras, números y espacios.
+    """
+    if not value:
+        return ""
+    value = str(value)
+    if not value.isascii():
+        value = unicodedata.normalize("NFKD", value)
+        value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", value.lower()).strip()
+
+def _word_trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def text_trigrams(value):
+    """
+    Retorna el conjunto de trigramas de las palabras de un texto.
+    """
+    grams = set()
+    for word in normalize_text(value).split():
+        grams |= _word_trigrams(word)
+    return grams
+
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+def _positions(bitset):
+    """
+    Retorna las posiciones de los bits encendidos de un entero usado como conjunto.
+    """
+    positions = []
+    data = bitset.to_bytes((bitset.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index * 8
+            positions.extend([base + bit for bit in _BYTE_BITS[byte]])
+    return positions
+
+def _popcount(bitset):
+    return bin(bitset).count("1")
+
+class MenuSearchIndex:
+    """
+    Índice de búsqueda tolerante a errores sobre el nombre y la descripción de los platillos.
+    Cada palabra de la consulta se compara por trigramas contra el vocabulario del menú
+    (mucho más pequeño que el catálogo), y los platillos candidatos salen de intersectar
+    los conjuntos de bits de las palabras encontradas. Solo los candidatos reciben el
+    score exacto (coeficiente de Dice sobre trigramas), así la búsqueda no recorre el catálogo.
+    Si la consulta es muy general (por ejemplo una sola palabra común) solo se puntúan
+    'max_scored' candidatos: primero los que tienen en el nombre más palabras de la consulta
+    y, entre ellos, los de nombre más corto. Es una aproximación: un platillo que quedó fuera
+    del corte puede tener mejor score que alguno de los puntuados (por ejemplo si su descripción
+    coincide mucho), así que con consultas muy generales se pierde algo de recall.
+    El índice se reconstruye cuando cambia el catálogo.
+    """
+
+    def __init__(self, description_weight=0.3, min_word_similarity=0.45, max_scored=64):
+        self.description_weight = description_weight
+        self.min_word_similarity = min_word_similarity
+        self.max_scored = max_scored
+        self._lock = threading.Lock()
+        self._source = None
+        self._state = None
+        self.builds = 0
+
+    def _build(self, items):
+        size = (len(items) + 7) // 8
+        words = {}
+        word_grams = []
+        name_bytes = []
+        description_bytes = []
+        name_grams = []
+        name_sizes = []
+        description_grams = []
+        available_bytes = bytearray(size)
+
+        # Las palabras numéricas se ignoran igual que en las consultas
+        def words_of(value):
+            return {word for word in normalize_text(value).split() if not word.isdigit()}
+
+        def word_id(word):
+            if word not in words:
+                words[word] = len(word_grams)
+                word_grams.append(frozenset(_word_trigrams(word)))
+                name_bytes.append(bytearray(size))
+                description_bytes.append(bytearray(size))
+            return words[word]
+
+        for position, item in enumerate(items):
+            index, bit = divmod(position, 8)
+            mask = 1 << bit
+            if item.get("available"):
+                available_bytes[index] |= mask
+            grams = set()
+            for word in words_of(item.get("name")):
+                wid = word_id(word)
+                name_bytes[wid][index] |= mask
+                grams |= word_grams[wid]
+            extra = set()
+            for word in words_of(item.get("description")):
+                wid = word_id(word)
+                description_bytes[wid][index] |= mask
+                extra |= word_grams[wid]
+            grams = frozenset(grams)
+            name_grams.append(grams)
+            name_sizes.append(len(grams))
+            description_grams.append(frozenset(extra - grams))
+
+        gram_words = {}
+        for wid, grams in enumerate(word_grams):
+            for gram in grams:
+                gram_words.setdefault(gram, []).append(wid)
+
+        self._state = {
+            "items": list(items),
+            "words": words,
+            "word_grams": word_grams,
+            "gram_words": gram_words,
+            "name_bits": [int.from_bytes(data, "little") for data in name_bytes],
+            "description_bits": [int.from_bytes(data, "little") for data in description_bytes],
+            "available_bits": int.from_bytes(available_bytes, "little"),
+            "name_grams": name_grams,
+            "name_sizes": name_sizes,
+            "description_grams": description_grams
+        }
+        self.builds += 1
+
+    def ensure(self, items):
+        """
+        Reconstruye el índice si 'items' no es el mismo catálogo con el que se construyó.
+        """
+        with self._lock:
+            if items is not self._source:
+                self._build(items)
+                self._source = items
+
+    def _similar_words(self, state, token):
+        """
+        Retorna los IDs de las palabras del vocabulario parecidas a 'token'.
+        """
+        wid = state["words"].get(token)
+        if wid is not None:
+            return [wid]
+        grams = _word_trigrams(token)
+        hits = Counter()
+        for gram in grams:
+            hits.update(state["gram_words"].get(gram, ()))
+        word_grams = state["word_grams"]
+        return [
+            wid for wid, shared in hits.items()
+            if 2.0 * shared / (len(grams) + len(word_grams[wid])) >= self.min_word_similarity
+        ]
+
+    def _candidates(self, token_bitsets, limit):
+        """
+        Intersecta los conjuntos de las palabras de la consulta, del más selectivo al menos,
+        mientras queden al menos 'limit' platillos.
+        """
+        token_bitsets = sorted((b for b in token_bitsets if b), key=_popcount)
+        if not token_bitsets:
+            return 0
+        candidates = token_bitsets[0]
+        for bitset in token_bitsets[1:]:
+            narrowed = candidates & bitset
+            if _popcount(narrowed) >= limit:
+                candidates = narrowed
+        return candidates
+
+    def _cut(self, state, candidates, name_sets, cut):
+        """
+        Elige 'cut' candidatos: por número de palabras de la consulta en el nombre (de más a menos)
+        y, con el mismo número, por tamaño del nombre. Los niveles se calculan con operaciones
+        de bits: at_least[m] son los candidatos con al menos m palabras de la consulta en el nombre.
+        """
+        at_least = [candidates] + [0] * len(name_sets)
+        for bitset in name_sets:
+            for m in range(len(name_sets), 0, -1):
+                at_least[m] |= at_least[m - 1] & bitset
+        at_least.append(0)
+        selected = []
+        for m in range(len(name_sets), -1, -1):
+            tier = _positions(at_least[m] & ~at_least[m + 1])
+            room = cut - len(selected)
+            if len(tier) > room:
+                tier = heapq.nsmallest(room, tier, key=state["name_sizes"].__getitem__)
+            selected.extend(tier)
+            if len(selected) >= cut:
+                break
+        return selected
+
+    def search(self, query, limit=10, available_only=False):
+        """
+        Retorna hasta 'limit' tuplas (score, item) ordenadas de mayor a menor score.
+        """
+        with self._lock:
+            state = self._state
+        # Se ignoran las cantidades, por ejemplo el "2" de "2 tacos al pastor"
+        tokens = [t for t in normalize_text(query).split() if not t.isdigit()]
+        if state is None or not tokens:
+            return []
+
+        name_sets = []
+        description_sets = []
+        for token in tokens:
+            name_bitset = 0
+            description_bitset = 0
+            for wid in self._similar_words(state, token):
+                name_bitset |= state["name_bits"][wid]
+                description_bitset |= state["description_bits"][wid]
+            name_sets.append(name_bitset)
+            description_sets.append(description_bitset)
+
+        # Con available_only los platillos no disponibles se quitan antes de limitar los candidatos
+        if available_only:
+            name_sets = [bitset & state["available_bits"] for bitset in name_sets]
+            description_sets = [bitset & state["available_bits"] for bitset in description_sets]
+        candidates = self._candidates(name_sets, limit)
+        if _popcount(candidates) < limit:
+            candidates |= self._candidates(description_sets, limit)
+
+        grams = text_trigrams(" ".join(tokens))
+        query_size = len(grams)
+        items = state["items"]
+        name_grams = state["name_grams"]
+        description_grams = state["description_grams"]
+        positions = _positions(candidates)
+        cut = max(self.max_scored, limit)
+        if len(positions) > cut:
+            positions = self._cut(state, candidates, name_sets, cut)
+        scored = []
+        for position in positions:
+            name = name_grams[position]
+            score = 2.0 * len(grams & name) / (query_size + len(name))
+            score += self.description_weight * len(grams & description_grams[position]) / query_size
+            scored.append((score, -position))
+        best = heapq.nlargest(limit, scored)
+        return [(round(score, 4), items[-position]) for score, position in best]
+
+menu_search_index = MenuSearchIndex()